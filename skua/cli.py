@@ -281,34 +281,33 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    # Lazy import commands to keep startup fast
-    from skua.commands import (
-        cmd_build, cmd_init, cmd_add, cmd_remove, cmd_run, cmd_stop, cmd_restart,
-        cmd_adapt, cmd_list, cmd_clean, cmd_purge, cmd_config, cmd_validate,
-        cmd_describe, cmd_credential, cmd_dashboard, cmd_merge, cmd_ssh,
-    )
+    # Only the selected command's module is imported, to keep startup fast.
+    import skua.commands
 
     commands = {
-        "init": cmd_init,
-        "build": cmd_build,
-        "add": cmd_add,
-        "merge": cmd_merge,
-        "remove": cmd_remove,
-        "run": cmd_run,
-        "stop": cmd_stop,
-        "restart": cmd_restart,
-        "adapt": cmd_adapt,
-        "list": cmd_list,
-        "dashboard": cmd_dashboard,
-        "clean": cmd_clean,
-        "purge": cmd_purge,
-        "config": cmd_config,
-        "validate": cmd_validate,
-        "describe": cmd_describe,
+        "init": "cmd_init",
+        "build": "cmd_build",
+        "add": "cmd_add",
+        "merge": "cmd_merge",
+        "remove": "cmd_remove",
+        "run": "cmd_run",
+        "stop": "cmd_stop",
+        "restart": "cmd_restart",
+        "adapt": "cmd_adapt",
+        "list": "cmd_list",
+        "dashboard": "cmd_dashboard",
+        "clean": "cmd_clean",
+        "purge": "cmd_purge",
+        "config": "cmd_config",
+        "validate": "cmd_validate",
+        "describe": "cmd_describe",
+    }
+    handlers = {
         "credential": _handle_credential,
         "ssh": _handle_ssh,
     }
-    commands[args.command](args)
+    handler = handlers.get(args.command) or getattr(skua.commands, commands[args.command])
+    handler(args)
 
 
 def _handle_credential(args):
@@ -11,7 +11,7 @@ from pathlib import Path
 from types import SimpleNamespace
 
 from skua.commands.credential import resolve_credential_sources
-from skua.commands.run import _credential_refresh_reason, _run_local_login
+from skua.commands.run import _credential_refresh_reason, _git_clone_command, _run_local_login
 from skua.config import ConfigStore, validate_project
 from skua.docker import (
     build_run_command,
@@ -378,11 +378,9 @@ def _ensure_project_directory(store: ConfigStore, project) -> Path:
         clone_dir = store.repo_dir(project.name)
         if not clone_dir.exists():
             print(f"Cloning {project.repo} into {clone_dir}...")
-            clone_cmd = ["git", "clone"]
-            if project.ssh.private_key:
-                ssh_cmd = f"ssh -i {project.ssh.private_key} -o StrictHostKeyChecking=no"
-                clone_cmd = ["git", "-c", f"core.sshCommand={ssh_cmd}", "clone"]
-            clone_cmd += [project.repo, str(clone_dir)]
+            clone_cmd = _git_clone_command(
+                project.repo, clone_dir, project.ssh.private_key, partial=project.git.partial_clone,
+            )
             try:
                 subprocess.run(clone_cmd, check=True)
             except subprocess.CalledProcessError:
@@ -566,10 +564,12 @@ def _normalize_adapt_argv(agent_name: str, argv: list) -> list:
     return argv
 
 
+_ANSI_ESCAPE_RE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+
+
 def _strip_ansi(text: str) -> str:
     """Return text with common ANSI escape sequences removed."""
-    ansi_re = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-    return ansi_re.sub("", text or "")
+    return _ANSI_ESCAPE_RE.sub("", text or "")
 
 
 def _is_entrypoint_noise(line: str) -> bool:
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: BUSL-1.1
 """skua add — add a project configuration."""
 
+import re
 import subprocess
 import sys
 from pathlib import Path
@@ -306,20 +307,22 @@ def _default_credential_name(store, base_name: str) -> str:
         i += 1
 
 
+# scheme://... or SCP-style user@host:path, with no embedded whitespace.
+_GIT_URL_RE = re.compile(r"(?:(?:https?|git|ssh)://|[\w.-]+@[\w.-]+:)\S+")
+_GIT_URL_MAX_LEN = 2048
+_HTTP_URL_PREFIXES = ("https://", "http://")
+
+
 def _is_git_url(url: str) -> bool:
     """Check if a string looks like a git URL."""
-    return (
-        url.startswith("https://")
-        or url.startswith("http://")
-        or url.startswith("git://")
-        or url.startswith("git@")
-        or url.startswith("ssh://")
-    )
+    if len(url) > _GIT_URL_MAX_LEN:
+        return False
+    return _GIT_URL_RE.fullmatch(url) is not None
 
 
 def _normalize_repo_url_for_ssh(url: str) -> str:
     """Normalize repo URLs to SSH form when HTTP(S) is provided."""
-    if url.startswith("https://") or url.startswith("http://"):
+    if url.startswith(_HTTP_URL_PREFIXES):
         ssh_url = _https_repo_to_ssh(url)
         if not ssh_url:
             raise ValueError(f"Cannot convert HTTPS repo URL to SSH: {url}")
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: BUSL-1.1
 """skua list — list projects and running containers."""
 
+import functools
 import json
 import subprocess
 from pathlib import Path
@@ -28,8 +29,12 @@ def _shorten_home_path(path: str) -> str:
         return path
 
 
+@functools.lru_cache(maxsize=512)
 def _github_source(repo_url: str) -> str:
-    """Return GITHUB:/owner/repo for GitHub URLs, or empty string if not GitHub."""
+    """Return GITHUB:/owner/repo for GitHub URLs, or empty string if not GitHub.
+
+    Projects often share a remote host/org, so parsed labels are cached.
+    """
     if not repo_url:
         return ""
 
@@ -2,18 +2,25 @@
 """skua run — start or attach to a container for a project."""
 
 import copy
+import functools
 import os
 import shutil
 import subprocess
 import sys
 import json
 import shlex
+import stat
 import base64
 import tempfile
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from types import SimpleNamespace
 
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib parser
+    orjson = None
+
 from skua.config import ConfigStore, validate_project
 from skua.commands.credential import resolve_credential_sources, agent_default_source_dir
 from skua.docker import (
@@ -36,6 +43,9 @@ from skua.docker import (
 from skua.project_adapt import ensure_adapt_workspace
 from skua.project_lock import ProjectBusyError, format_project_busy_error, project_operation_lock
 
+# Accepts str or bytes; orjson raises a json.JSONDecodeError subclass on bad input.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 def _is_snap_binary(path: str) -> bool:
     if not path:
@@ -363,17 +373,30 @@ def _source_volume_name(project_name: str, source, index: int) -> str:
     return f"skua-{project_name}-{_sanitize_mount_name(label).lower()}-repo"
 
 
-def _clone_local_repo(source, clone_dir: Path):
+def _git_clone_command(repo: str, clone_dir: Path, private_key: str = "", partial: bool = False) -> list:
+    """Return the argv for cloning repo into clone_dir, optionally via an SSH key.
+
+    The key is stored as the clone's ``core.sshCommand`` so later fetches from
+    the host use it too. ``partial`` makes a blobless clone; file contents
+    outside the checked-out tree are then fetched on demand, which needs
+    network access.
+    """
+    clone_cmd = ["git", "clone"]
+    if private_key:
+        ssh_cmd = "ssh -i " + private_key + " -o StrictHostKeyChecking=no"
+        clone_cmd += ["-c", "core.sshCommand=" + ssh_cmd]
+    if partial:
+        clone_cmd.append("--filter=blob:none")
+    return clone_cmd + [repo, str(clone_dir)]
+
+
+def _clone_local_repo(source, clone_dir: Path, partial: bool = False):
     """Clone a git repo to a local directory when missing."""
     if clone_dir.exists():
         return
     print(f"Cloning {source.repo} into {clone_dir}...")
-    clone_cmd = ["git", "clone"]
     ssh_key = str(getattr(source, "ssh_private_key", "") or "").strip()
-    if ssh_key:
-        ssh_cmd = f"ssh -i {ssh_key} -o StrictHostKeyChecking=no"
-        clone_cmd = ["git", "-c", f"core.sshCommand={ssh_cmd}", "clone"]
-    clone_cmd += [source.repo, str(clone_dir)]
+    clone_cmd = _git_clone_command(source.repo, clone_dir, ssh_key, partial=partial)
     try:
         subprocess.run(clone_cmd, check=True)
     except subprocess.CalledProcessError:
@@ -428,7 +451,7 @@ def _resolve_source_mounts(store: ConfigStore, project) -> list:
         if getattr(source, "repo", ""):
             clone_key = getattr(source, "project", "") or getattr(source, "name", "") or f"src-{index + 1}"
             clone_dir = store.repo_dir(f"{project.name}-{_sanitize_mount_name(clone_key)}")
-            _clone_local_repo(source, clone_dir)
+            _clone_local_repo(source, clone_dir, partial=project.git.partial_clone)
             source_dir = clone_dir
         else:
             source_dir = Path(str(getattr(source, "directory", "") or "")).expanduser().resolve()
@@ -545,8 +568,13 @@ def _parse_expiry_datetime(value):
     return None
 
 
+@functools.lru_cache(maxsize=256)
 def _jwt_expiry_datetime(token: str):
-    """Best-effort parse of JWT `exp` claim without signature verification."""
+    """Best-effort parse of JWT `exp` claim without signature verification.
+
+    Results are cached per token string so repeated refresh checks skip the
+    base64/JSON decode.
+    """
     if not isinstance(token, str):
         return None
     parts = token.strip().split(".")
@@ -557,8 +585,7 @@ def _jwt_expiry_datetime(token: str):
         return None
     pad = "=" * (-len(payload_b64) % 4)
     try:
-        payload_raw = base64.urlsafe_b64decode(payload_b64 + pad)
-        payload = json.loads(payload_raw.decode("utf-8"))
+        payload = _json_loads(base64.urlsafe_b64decode(payload_b64 + pad))
     except (ValueError, json.JSONDecodeError, UnicodeDecodeError):
         return None
     exp = payload.get("exp")
@@ -596,10 +623,28 @@ def _extract_expiry_values(obj) -> list:
     return values
 
 
-def _credential_file_expiry(path: Path):
-    """Return earliest detected expiry in a JSON credential file, else None."""
+def _credential_file_expiry(path: Path, st: os.stat_result = None):
+    """Return earliest detected expiry in a JSON credential file, else None.
+
+    Results are cached per path and reused until the file's inode, size,
+    mtime or ctime changes, so repeated refresh checks cost a single stat.
+    Callers that already stat'ed the file may pass the result as ``st``.
+    """
+    if st is None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+    # ctime and inode catch same-size rewrites that keep a coarse mtime.
+    stamp = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    return _credential_file_expiry_for_stamp(str(path), stamp)
+
+
+@functools.lru_cache(maxsize=256)
+def _credential_file_expiry_for_stamp(path: str, stamp: tuple):
+    """Parse a credential file's expiry; ``stamp`` only keys the cache."""
     try:
-        data = json.loads(path.read_text())
+        data = _json_loads(Path(path).read_bytes())
     except (OSError, json.JSONDecodeError, UnicodeDecodeError):
         return None
     expiries = _extract_expiry_values(data)
@@ -613,14 +658,21 @@ def _credential_refresh_reason(cred, agent, now=None) -> str:
     sources = resolve_credential_sources(cred, agent)
     if not sources:
         return ""
-    existing = [(src, dest_name) for src, dest_name in sources if src.is_file()]
+    existing = []
+    for src, dest_name in sources:
+        try:
+            st = src.stat()
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            existing.append((src, dest_name, st))
 
     if not existing:
         return "no local credential files were found"
 
     stale = []
-    for src, dest_name in existing:
-        expiry = _credential_file_expiry(src)
+    for src, dest_name, st in existing:
+        expiry = _credential_file_expiry(src, st)
         if expiry and expiry <= stale_cutoff:
             stale.append((dest_name, expiry))
 
@@ -19,6 +19,10 @@ from skua.config.resources import (
     resource_to_dict,
 )
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 CONFIG_DIR = Path.home() / ".config" / "skua"
 
@@ -49,13 +53,21 @@ class ConfigStore:
     def __init__(self, config_dir: Optional[Path] = None):
         self.config_dir = config_dir or CONFIG_DIR
         self.global_file = self.config_dir / "global.yaml"
+        self._repos_dir = self.config_dir / "repos"
+        self._repo_dir_cache = {}
+        self._data_dir_cache = {}
         self._global_cache = None
+        self._kind_dirs = tuple(self.config_dir / subdir for subdir in KIND_DIRS.values())
+        self._dirs_ensured = False
 
     def ensure_dirs(self):
-        """Create config directory structure."""
+        """Create config directory structure (once per store instance)."""
+        if self._dirs_ensured:
+            return
         self.config_dir.mkdir(parents=True, exist_ok=True)
-        for subdir in KIND_DIRS.values():
-            (self.config_dir / subdir).mkdir(exist_ok=True)
+        for kind_dir in self._kind_dirs:
+            kind_dir.mkdir(exist_ok=True)
+        self._dirs_ensured = True
 
     # ── Global config ────────────────────────────────────────────────
 
@@ -65,7 +77,7 @@ class ConfigStore:
             return self._global_cache
         if self.global_file.exists():
             with open(self.global_file) as f:
-                self._global_cache = yaml.safe_load(f) or {}
+                self._global_cache = yaml.load(f, Loader=_YamlLoader) or {}
         else:
             self._global_cache = {}
         return self._global_cache
@@ -74,7 +86,7 @@ class ConfigStore:
         """Write global.yaml."""
         self.ensure_dirs()
         with open(self.global_file, "w") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(data, f, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
         self._global_cache = data
 
     def get_global_defaults(self) -> dict:
@@ -94,20 +106,26 @@ class ConfigStore:
 
     def save_resource(self, resource):
         """Save a resource to its YAML file."""
-        kind = type(resource).__name__
+        self.save_resources([resource])
+
+    def save_resources(self, resources):
+        """Save several resources, creating the directory layout only once."""
         self.ensure_dirs()
-        path = self._resource_path(kind, resource.name)
-        data = resource_to_dict(resource)
-        with open(path, "w") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+        for resource in resources:
+            kind = type(resource).__name__
+            path = self._resource_path(kind, resource.name)
+            data = resource_to_dict(resource)
+            with open(path, "w") as f:
+                yaml.dump(data, f, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
 
     def load_resource(self, kind: str, name: str):
         """Load a single resource by kind and name. Returns None if not found."""
         path = self._resource_path(kind, name)
-        if not path.exists():
+        try:
+            with open(path) as f:
+                data = yaml.load(f, Loader=_YamlLoader)
+        except FileNotFoundError:
             return None
-        with open(path) as f:
-            data = yaml.safe_load(f)
         if data is None:
             return None
         return resource_from_dict(data)
@@ -228,9 +246,15 @@ class ConfigStore:
 
     def project_data_dir(self, project_name: str, agent_name: str = "claude") -> Path:
         """Return the bind-mount persistence directory for a project/agent."""
-        if not agent_name or agent_name == "claude":
-            return self.config_dir / "claude-data" / project_name
-        return self.config_dir / "agent-data" / agent_name / project_name
+        key = (project_name, agent_name)
+        path = self._data_dir_cache.get(key)
+        if path is None:
+            if not agent_name or agent_name == "claude":
+                path = self.config_dir / "claude-data" / project_name
+            else:
+                path = self.config_dir / "agent-data" / agent_name / project_name
+            self._data_dir_cache[key] = path
+        return path
 
     def claude_data_dir(self, project_name: str) -> Path:
         """Backward-compatible Claude data path helper."""
@@ -238,11 +262,14 @@ class ConfigStore:
 
     def repos_dir(self) -> Path:
         """Return the base directory for cloned repositories."""
-        return self.config_dir / "repos"
+        return self._repos_dir
 
     def repo_dir(self, project_name: str) -> Path:
         """Return the clone directory for a specific project's repo."""
-        return self.repos_dir() / project_name
+        path = self._repo_dir_cache.get(project_name)
+        if path is None:
+            path = self._repo_dir_cache[project_name] = self._repos_dir / project_name
+        return path
 
     # ── Tool directory ───────────────────────────────────────────────
 
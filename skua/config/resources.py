@@ -5,13 +5,14 @@ Each resource type corresponds to a Kubernetes-style YAML file with
 apiVersion, kind, metadata, and spec fields.
 """
 
-from dataclasses import dataclass, field
+import functools
+from dataclasses import dataclass, field, fields, is_dataclass
 from typing import Optional
 
 
 # ── Environment ──────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class DockerDriverSpec:
     runtime: str = "local"          # local | remote
     remote_host: str = ""           # ssh://user@host (when runtime=remote)
@@ -19,32 +20,32 @@ class DockerDriverSpec:
     container_runtime: str = ""     # "" (default/runc) | runsc (gVisor) | kata
 
 
-@dataclass
+@dataclass(slots=True)
 class ComposeDriverSpec:
     runtime: str = "local"
     cleanup: str = "ephemeral"
 
 
-@dataclass
+@dataclass(slots=True)
 class KubernetesDriverSpec:
     context: str = ""
     namespace: str = "skua"
     storage_class: str = "standard"
 
 
-@dataclass
+@dataclass(slots=True)
 class PersistenceSpec:
     mode: str = "bind"              # bind | volume
     base_path: str = "~/.config/skua/claude-data"
     volume_prefix: str = "skua"
 
 
-@dataclass
+@dataclass(slots=True)
 class NetworkSpec:
     mode: str = "bridge"            # none | bridge | internal | host
 
 
-@dataclass
+@dataclass(slots=True)
 class Environment:
     """Describes where and how containers run.
 
@@ -111,46 +112,46 @@ class Environment:
 
 # ── SecurityProfile ──────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class ProxySpec:
     allowed_domains: list = field(default_factory=list)
     log_requests: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityNetworkSpec:
     outbound: str = "unrestricted"  # unrestricted | none | proxy
     proxy: ProxySpec = field(default_factory=ProxySpec)
 
 
-@dataclass
+@dataclass(slots=True)
 class VerifiedInstallSpec:
     auto_approve: list = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityInstallSpec:
     mode: str = "none"              # unrestricted | advisory | verified | none
     verified: VerifiedInstallSpec = field(default_factory=VerifiedInstallSpec)
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityAuditSpec:
     mode: str = "none"              # none | advisory | trusted
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageUpdatesSpec:
     mode: str = "disabled"          # disabled | suggest | auto
     source: str = "audit"           # audit | proxy
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityAgentSpec:
     sudo: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityProfile:
     """Declares what the agent is and isn't allowed to do."""
     name: str = ""
@@ -186,14 +187,14 @@ class SecurityProfile:
 
 # ── AgentConfig ──────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class AgentInstallSpec:
     commands: list = field(default_factory=list)
     required_packages: list = field(default_factory=list)
     base_image: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentRuntimeSpec:
     command: str = ""
     adapt_command: str = ""         # optional non-interactive command template
@@ -201,14 +202,14 @@ class AgentRuntimeSpec:
     entrypoint_hooks: list = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentAuthSpec:
     dir: str = ""                   # directory mounted for persistence
     files: list = field(default_factory=list)
     login_command: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentConfig:
     """Describes an AI agent: install, auth, runtime."""
     name: str = ""
@@ -219,7 +220,7 @@ class AgentConfig:
 
 # ── Credential ───────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class Credential:
     """Named credential set for an agent, pointing to host credential files."""
     name: str = ""
@@ -230,18 +231,19 @@ class Credential:
 
 # ── Project ──────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class ProjectGitSpec:
     name: str = ""
     email: str = ""
+    partial_clone: bool = False     # clone with --filter=blob:none (lazy blob fetches need network)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectSshSpec:
     private_key: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectImageSpec:
     base_image: str = ""
     from_image: str = ""
@@ -250,14 +252,14 @@ class ProjectImageSpec:
     version: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectStateSpec:
     status: str = ""                # idle when empty; adapting | building | stopping | ...
     lock_owner: str = ""            # host:pid that currently holds the project lock
     lock_acquired_at: str = ""      # ISO-8601 UTC timestamp
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectSourceSpec:
     project: str = ""               # originating project name (informational)
     name: str = ""                  # stable source label
@@ -269,7 +271,7 @@ class ProjectSourceSpec:
     primary: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     """Ties Environment, SecurityProfile, and AgentConfig together for a codebase."""
     name: str = ""
@@ -330,71 +332,95 @@ def resource_from_dict(data: dict):
     return _dict_to_dataclass(cls, spec)
 
 
+@functools.lru_cache(maxsize=None)
+def _field_names(cls) -> tuple:
+    """Return the field names of a dataclass type (stable per class, so cached)."""
+    return tuple(f.name for f in fields(cls))
+
+
 def _dataclass_to_dict(obj) -> dict:
     """Recursively convert a dataclass to a plain dict."""
-    from dataclasses import fields, is_dataclass
     if not is_dataclass(obj):
         return obj
     result = {}
-    for f in fields(obj):
-        val = getattr(obj, f.name)
+    for name in _field_names(type(obj)):
+        val = getattr(obj, name)
         if is_dataclass(val):
             val = _dataclass_to_dict(val)
         elif isinstance(val, list):
             val = [_dataclass_to_dict(v) if is_dataclass(v) else v for v in val]
         elif isinstance(val, dict):
             val = {k: _dataclass_to_dict(v) if is_dataclass(v) else v for k, v in val.items()}
-        result[f.name] = val
+        result[name] = val
     return result
 
 
-def _dict_to_dataclass(cls, data: dict):
-    """Recursively construct a dataclass from a dict, using snake_case field matching."""
-    from dataclasses import fields, is_dataclass
-
-    if not isinstance(data, dict):
-        return data
-
-    kwargs = {}
-    field_map = {f.name: f for f in fields(cls)}
+@functools.lru_cache(maxsize=None)
+def _field_plan(cls) -> dict:
+    """Return ``{field_name: (nested_kind, nested_cls)}`` for a dataclass type.
 
-    # Also build a camelCase → snake_case lookup
-    alias_map = {}
+    Annotations are resolved once per class. ``nested_kind`` is ``"dataclass"``
+    for a nested resource spec, ``"list"`` for ``list[<dataclass>]``, or
+    ``None`` for values that are passed through unchanged.
+    """
+    plan = {}
     for f in fields(cls):
-        # Convert snake_case field name to camelCase for YAML compatibility
-        parts = f.name.split("_")
-        camel = parts[0] + "".join(p.capitalize() for p in parts[1:])
-        alias_map[camel] = f.name
-        alias_map[f.name] = f.name
-
-    for key, val in data.items():
-        field_name = alias_map.get(key, key)
-        if field_name not in field_map:
-            continue
-        f = field_map[field_name]
         field_type = f.type
 
         # Resolve string type annotations
         if isinstance(field_type, str):
             field_type = eval(field_type)
 
-        # Handle Optional/list types
         origin = getattr(field_type, "__origin__", None)
-        if origin is list and isinstance(val, list):
+        if origin is list:
             inner = getattr(field_type, "__args__", [None])[0]
             if inner is not None and isinstance(inner, str):
                 inner = eval(inner)
             if inner is not None and is_dataclass(inner):
-                kwargs[field_name] = [
-                    _dict_to_dataclass(inner, item) if isinstance(item, dict) else item
-                    for item in val
-                ]
-            else:
-                kwargs[field_name] = val
-        elif origin is not None:
-            kwargs[field_name] = val
-        elif is_dataclass(field_type):
-            kwargs[field_name] = _dict_to_dataclass(field_type, val) if isinstance(val, dict) else val
+                plan[f.name] = ("list", inner)
+                continue
+        elif origin is None and is_dataclass(field_type):
+            plan[f.name] = ("dataclass", field_type)
+            continue
+        plan[f.name] = (None, None)
+    return plan
+
+
+@functools.lru_cache(maxsize=None)
+def _field_aliases(cls) -> dict:
+    """Return a camelCase/snake_case key → field name lookup for a dataclass type."""
+    alias_map = {}
+    for name in _field_names(cls):
+        # Convert snake_case field name to camelCase for YAML compatibility
+        parts = name.split("_")
+        camel = parts[0] + "".join(p.capitalize() for p in parts[1:])
+        alias_map[camel] = name
+        alias_map[name] = name
+    return alias_map
+
+
+def _dict_to_dataclass(cls, data: dict):
+    """Recursively construct a dataclass from a dict, using snake_case field matching."""
+    if not isinstance(data, dict):
+        return data
+
+    kwargs = {}
+    plan = _field_plan(cls)
+    alias_map = _field_aliases(cls)
+
+    for key, val in data.items():
+        field_name = alias_map.get(key, key)
+        if field_name not in plan:
+            continue
+        nested_kind, nested_cls = plan[field_name]
+
+        if nested_kind == "list" and isinstance(val, list):
+            kwargs[field_name] = [
+                _dict_to_dataclass(nested_cls, item) if isinstance(item, dict) else item
+                for item in val
+            ]
+        elif nested_kind == "dataclass" and isinstance(val, dict):
+            kwargs[field_name] = _dict_to_dataclass(nested_cls, val)
         else:
             kwargs[field_name] = val
 
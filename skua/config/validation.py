@@ -7,6 +7,23 @@ Enforces two types of rules:
 """
 
 
+# Stable codes for issues that callers may need to recognise programmatically.
+ISSUE_NO_DIRECTORY = "project.no-directory"
+
+
+class ValidationIssue(str):
+    """An error/warning message that also carries a stable ``code``.
+
+    Subclasses ``str`` so existing callers can keep printing and joining
+    issues as plain messages, while new callers compare ``issue.code``.
+    """
+
+    def __new__(cls, message: str, code: str = ""):
+        issue = super().__new__(cls, message)
+        issue.code = code
+        return issue
+
+
 class ValidationError(Exception):
     """Raised when configuration validation fails."""
     def __init__(self, errors: list, warnings: list = None):
@@ -22,11 +39,11 @@ class ValidationResult:
         self.errors = []
         self.warnings = []
 
-    def error(self, msg: str):
-        self.errors.append(msg)
+    def error(self, msg: str, code: str = ""):
+        self.errors.append(ValidationIssue(msg, code))
 
-    def warn(self, msg: str):
-        self.warnings.append(msg)
+    def warn(self, msg: str, code: str = ""):
+        self.warnings.append(ValidationIssue(msg, code))
 
     @property
     def valid(self) -> bool:
@@ -186,7 +203,7 @@ def validate_project(project, environment, security, agent) -> ValidationResult:
 
     # Step 5: Project-level checks
     if not project.directory and not project.repo and not getattr(project, "sources", None):
-        result.warn("project has no directory set")
+        result.warn("project has no directory set", code=ISSUE_NO_DIRECTORY)
 
     return result
 
@@ -2,6 +2,7 @@
 """Docker operations — build images, run containers, query state."""
 
 import base64
+import functools
 import hashlib
 import json
 import os
@@ -62,6 +63,7 @@ def get_running_skua_containers(host: str = "") -> list | None:
     return []
 
 
+@functools.lru_cache(maxsize=256)
 def image_name_for_agent(base_image_name: str, agent_name: str) -> str:
     """Return an agent-specific image name, preserving an optional tag."""
     base = (base_image_name or "skua-base").strip().lower()
@@ -302,6 +304,8 @@ AGENT_VERSION_NPM_PACKAGES = {
 }
 _AGENT_VERSION_CACHE = {}
 AGENT_VERSION_CACHE_TTL_SECONDS = 300
+_AGENT_LABEL_UNSAFE_RE = re.compile(r"[^a-z0-9_.-]+")
+_BUILD_STEP_RE = re.compile(r"^(step|STEP)\s+(\d+)\s*/\s*(\d+)")
 
 
 def _agent_version_cache_path() -> Path:
@@ -400,7 +404,7 @@ def agent_install_uses_floating_version(agent: AgentConfig = None) -> bool:
 
 def _agent_version_label_key(agent_name: str) -> str:
     """Return a stable image label key for a given agent."""
-    safe = re.sub(r"[^a-z0-9_.-]+", "-", str(agent_name or "").strip().lower())
+    safe = _AGENT_LABEL_UNSAFE_RE.sub("-", str(agent_name or "").strip().lower())
     if not safe:
         safe = "agent"
     return f"{AGENT_VERSION_LABEL_PREFIX}{safe}"
@@ -911,7 +915,6 @@ def build_image(
         if has_buildx:
             # Insert before the build path (last element)
             progress_cmd.insert(-1, "--progress=plain")
-        step_re = re.compile(r"^(step|STEP)\s+(\d+)\s*/\s*(\d+)")
         tail = deque(maxlen=20)
         printed_progress = False
         current_step = 0
@@ -937,7 +940,7 @@ def build_image(
             stripped = line.strip()
             if stripped:
                 tail.append(stripped)
-            match = step_re.match(stripped)
+            match = _BUILD_STEP_RE.match(stripped)
             if match:
                 current_step = int(match.group(2))
                 total_steps = int(match.group(3))
@@ -1144,6 +1147,9 @@ def run_container(docker_cmd: list):
     os.execvp("docker", docker_cmd)
 
 
+_HASH_CHUNK_SIZE = 64 * 1024
+
+
 def _hash_with_marker(hasher, marker: str, value):
     """Update a hash with a marker and optional bytes payload."""
     hasher.update(marker.encode("utf-8"))
@@ -1157,6 +1163,21 @@ def _hash_with_marker(hasher, marker: str, value):
     hasher.update(b"\0")
 
 
+def _hash_file_with_marker(hasher, marker: str, path: Path):
+    """Like _hash_with_marker, but stream a file's bytes (or <missing>) into the hash."""
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        _hash_with_marker(hasher, marker, None)
+        return
+    hasher.update(marker.encode("utf-8"))
+    hasher.update(b"\0")
+    with f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    hasher.update(b"\0")
+
+
 def compute_build_context_hash(
     container_dir: Path,
     security: SecurityProfile = None,
@@ -1191,35 +1212,24 @@ def compute_build_context_hash(
     _hash_with_marker(hasher, "base_image_ref", base_image)
     _hash_with_marker(hasher, "base_image_id", _local_image_id(base_image))
     if not layer_on_base:
-        _hash_with_marker(hasher, "entrypoint", entrypoint_path.read_bytes() if entrypoint_path.exists() else None)
+        _hash_file_with_marker(hasher, "entrypoint", entrypoint_path)
     _hash_with_marker(hasher, "uid", str(os.getuid()))
     _hash_with_marker(hasher, "gid", str(os.getgid()))
 
     if not layer_on_base:
         claude_home = Path.home() / ".claude"
         for fname in ("settings.json", "settings.local.json"):
-            src = claude_home / fname
-            _hash_with_marker(hasher, f"claude-default:{fname}", src.read_bytes() if src.exists() else None)
-
-        check_monitoring_path = container_dir / "check_monitoring.sh"
-        _hash_with_marker(
-            hasher,
-            "check_monitoring",
-            check_monitoring_path.read_bytes() if check_monitoring_path.exists() else None,
-        )
-        tmux_attach_banner_path = container_dir / "tmux-attach-banner.sh"
-        _hash_with_marker(
-            hasher,
-            "tmux_attach_banner",
-            tmux_attach_banner_path.read_bytes() if tmux_attach_banner_path.exists() else None,
-        )
+            _hash_file_with_marker(hasher, f"claude-default:{fname}", claude_home / fname)
+
+        _hash_file_with_marker(hasher, "check_monitoring", container_dir / "check_monitoring.sh")
+        _hash_file_with_marker(hasher, "tmux_attach_banner", container_dir / "tmux-attach-banner.sh")
 
         for subdir in ("hooks", ".entrypoint.d"):
             script_dir = container_dir / subdir
             if script_dir.is_dir():
                 for script_file in sorted(script_dir.iterdir()):
                     if script_file.is_file():
-                        _hash_with_marker(hasher, f"{subdir}:{script_file.name}", script_file.read_bytes())
+                        _hash_file_with_marker(hasher, f"{subdir}:{script_file.name}", script_file)
 
     return hasher.hexdigest()
 
@@ -0,0 +1,8 @@
+# SPDX-License-Identifier: BUSL-1.1
+"""Shared pytest configuration for the skua test suite."""
+
+import sys
+from pathlib import Path
+
+# Test the checkout, never an installed skua.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
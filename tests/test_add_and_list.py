@@ -2,18 +2,15 @@
 """Tests for add/list credential behavior."""
 
 import argparse
+import copy
 import io
 import tempfile
 import unittest
 from contextlib import redirect_stdout
 from pathlib import Path
-import sys
 from types import SimpleNamespace
 from unittest import mock
 
-# Ensure the skua package is importable
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
 from skua.config.resources import (
     AgentAuthSpec,
     AgentConfig,
@@ -25,23 +22,25 @@ from skua.config.resources import (
 
 
 class TestAddCredentialSelection(unittest.TestCase):
-    @staticmethod
-    def _args(**kwargs):
-        defaults = dict(
-            name="test-proj",
-            dir=None,
-            repo="https://github.com/u/r.git",
-            ssh_key="",
-            env=None,
-            security=None,
-            agent=None,
-            credential=None,
-            no_credential=False,
-            quick=True,
-            no_prompt=True,
-        )
-        defaults.update(kwargs)
-        return argparse.Namespace(**defaults)
+    _DEFAULT_ARGS = argparse.Namespace(
+        name="test-proj",
+        dir=None,
+        repo="https://github.com/u/r.git",
+        ssh_key="",
+        env=None,
+        security=None,
+        agent=None,
+        credential=None,
+        no_credential=False,
+        quick=True,
+        no_prompt=True,
+    )
+
+    @classmethod
+    def _args(cls, **kwargs):
+        args = copy.copy(cls._DEFAULT_ARGS)
+        vars(args).update(kwargs)
+        return args
 
     @staticmethod
     def _claude_agent():
@@ -4,12 +4,8 @@
 import tempfile
 import unittest
 from pathlib import Path
-import sys
 from unittest import mock
 
-# Ensure the skua package is importable
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
 from skua.commands.credential import _any_auth_files_present, resolve_credential_sources
 from skua.config.resources import AgentAuthSpec, AgentConfig
 
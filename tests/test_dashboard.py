@@ -4,6 +4,7 @@
 import argparse
 import json
 import subprocess
+import sys
 import tempfile
 import time
 import unittest
@@ -11,9 +12,6 @@ from pathlib import Path
 from types import SimpleNamespace
 from unittest import mock
 
-import sys
-
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 class TestDashboardSnapshot(unittest.TestCase):
     @mock.patch("skua.commands.dashboard.image_exists", return_value=True)
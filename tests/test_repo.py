@@ -13,16 +13,20 @@ Validates:
 
 import argparse
 import base64
+import copy
+import dataclasses
+import functools
 import json
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
-import textwrap
 import time
 import unittest
 from datetime import datetime, timezone
 from pathlib import Path
+from types import SimpleNamespace
 from unittest import mock
 
 # Ensure the skua package is importable
@@ -36,7 +40,54 @@ from skua.config.resources import (
     resource_to_dict, resource_from_dict,
 )
 from skua.config.loader import ConfigStore
-from skua.commands.add import _is_git_url, _https_repo_to_ssh, _normalize_repo_url_for_ssh
+from skua.config.validation import ISSUE_NO_DIRECTORY, validate_project
+from skua.commands.add import _is_git_url, _https_repo_to_ssh, _normalize_repo_url_for_ssh, cmd_add
+from skua.commands.build import _required_projects, cmd_build
+from skua.commands.list_cmd import _format_project_source
+from skua.commands.merge import cmd_merge
+from skua.commands.run import (
+    _credential_file_expiry,
+    _credential_refresh_reason,
+    _detached_run_command,
+    _git_clone_command,
+    _jwt_expiry_datetime,
+    _seed_auth_from_host,
+)
+import skua.docker as docker_mod
+from skua.docker import (
+    agent_install_uses_floating_version, base_image_for_agent, build_image,
+    build_run_command, compute_build_context_hash, exec_into_container,
+    floating_agent_update_available, generate_dockerfile, image_matches_build_context,
+    image_name_for_agent, image_name_for_project, image_rebuild_needed,
+    resolve_project_image_inputs,
+)
+
+# Fixed SSH material for the remote-host run command test.
+_KEY_DATA = "test-key"
+_KEY_B64 = base64.b64encode(_KEY_DATA.encode("utf-8")).decode("ascii")
+_PUB_DATA = "ssh-ed25519 AAAA test"
+_PUB_B64 = base64.b64encode(_PUB_DATA.encode("utf-8")).decode("ascii")
+_KH_DATA = "github.com ssh-ed25519 AAAA"
+_KH_B64 = base64.b64encode(_KH_DATA.encode("utf-8")).decode("ascii")
+
+# RAM-backed scratch root for store-only tests that never hand paths to a
+# subprocess; falls back to the platform default where /dev/shm is absent.
+_RAM_TMP_ROOT = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+
+def _flag_values(cmd: list, flag: str) -> list:
+    """Return the argv values that directly follow each occurrence of ``flag``."""
+    return [value for prev, value in zip(cmd, cmd[1:]) if prev == flag]
+
+
+def _env_of(cmd: list) -> dict:
+    """Map ``-e KEY=VALUE`` pairs of a docker command to a dict."""
+    return dict(value.split("=", 1) for value in _flag_values(cmd, "-e") if "=" in value)
+
+
+def _mounts_of(cmd: list) -> list:
+    """Return the ``-v`` mount specs of a docker command."""
+    return _flag_values(cmd, "-v")
 
 
 class TestProjectRepoField(unittest.TestCase):
@@ -113,17 +164,19 @@ class TestProjectRepoField(unittest.TestCase):
 class TestConfigStoreRepoPaths(unittest.TestCase):
     """Test ConfigStore repo directory helpers."""
 
-    def setUp(self):
-        self.tmpdir = tempfile.mkdtemp()
-        self.store = ConfigStore(config_dir=Path(self.tmpdir))
+    @classmethod
+    def setUpClass(cls):
+        # The path helpers never touch disk, so one store serves every test.
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        cls.store = ConfigStore(config_dir=cls.tmpdir)
+        cls.repos_dir = cls.tmpdir / "repos"
 
     def test_repos_dir(self):
-        expected = Path(self.tmpdir) / "repos"
-        self.assertEqual(self.store.repos_dir(), expected)
+        self.assertEqual(self.store.repos_dir(), self.repos_dir)
 
     def test_repo_dir(self):
-        expected = Path(self.tmpdir) / "repos" / "myproject"
-        self.assertEqual(self.store.repo_dir("myproject"), expected)
+        self.assertEqual(self.store.repo_dir("myproject"), self.repos_dir / "myproject")
 
     def test_repo_dir_different_projects(self):
         self.assertNotEqual(
@@ -132,54 +185,40 @@ class TestConfigStoreRepoPaths(unittest.TestCase):
         )
 
     def test_project_data_dir_claude_legacy_path(self):
-        expected = Path(self.tmpdir) / "claude-data" / "myproject"
+        expected = self.tmpdir / "claude-data" / "myproject"
         self.assertEqual(self.store.project_data_dir("myproject", "claude"), expected)
 
     def test_project_data_dir_non_claude_path(self):
-        expected = Path(self.tmpdir) / "agent-data" / "codex" / "myproject"
+        expected = self.tmpdir / "agent-data" / "codex" / "myproject"
         self.assertEqual(self.store.project_data_dir("myproject", "codex"), expected)
 
 
 class TestAgentImageNaming(unittest.TestCase):
     """Test image naming strategy for per-agent base images."""
 
-    def test_default_pattern(self):
-        from skua.docker import image_name_for_agent
-        self.assertEqual(image_name_for_agent("skua-base", "codex"), "skua-base-codex")
-        self.assertEqual(image_name_for_agent("skua-base", "claude"), "skua-base-claude")
-
-    def test_preserves_tag(self):
-        from skua.docker import image_name_for_agent
-        self.assertEqual(
-            image_name_for_agent("myorg/skua-base:latest", "codex"),
-            "myorg/skua-base-codex:latest",
-        )
+    CASES = [
+        # (base image, agent, expected)
+        ("skua-base", "codex", "skua-base-codex"),
+        ("skua-base", "claude", "skua-base-claude"),
+        ("myorg/skua-base:latest", "codex", "myorg/skua-base-codex:latest"),      # tag preserved
+        ("localhost:5000/skua-base", "claude", "localhost:5000/skua-base-claude"),  # port is not a tag
+        ("skua-base-codex", "codex", "skua-base-codex"),                          # idempotent
+    ]
 
-    def test_registry_port_not_treated_as_tag(self):
-        from skua.docker import image_name_for_agent
-        self.assertEqual(
-            image_name_for_agent("localhost:5000/skua-base", "claude"),
-            "localhost:5000/skua-base-claude",
-        )
-
-    def test_idempotent_if_suffix_present(self):
-        from skua.docker import image_name_for_agent
-        self.assertEqual(
-            image_name_for_agent("skua-base-codex", "codex"),
-            "skua-base-codex",
-        )
+    def test_image_name_for_agent(self):
+        for base, agent_name, expected in self.CASES:
+            with self.subTest(base=base, agent=agent_name):
+                self.assertEqual(image_name_for_agent(base, agent_name), expected)
 
 
 class TestProjectImageNaming(unittest.TestCase):
     """Test project image naming and build input resolution."""
 
     def test_project_without_customizations_uses_agent_image(self):
-        from skua.docker import image_name_for_project
         project = Project(name="myproj", agent="codex")
         self.assertEqual(image_name_for_project("skua-base", project), "skua-base-codex")
 
     def test_project_customizations_get_project_version_suffix(self):
-        from skua.docker import image_name_for_project
         project = Project(
             name="myproj",
             agent="codex",
@@ -191,7 +230,6 @@ class TestProjectImageNaming(unittest.TestCase):
         )
 
     def test_resolve_project_image_inputs_prefers_from_image(self):
-        from skua.docker import resolve_project_image_inputs
         project = Project(
             name="myproj",
             agent="codex",
@@ -217,8 +255,6 @@ class TestProjectImageNaming(unittest.TestCase):
 
 class TestCompositeProjects(unittest.TestCase):
     def test_build_run_command_mounts_multiple_sources(self):
-        from skua.docker import build_run_command
-
         project = Project(name="merged", agent="claude", directory="/tmp/a")
         env = Environment(name="local-docker")
         sec = SecurityProfile(name="open")
@@ -237,14 +273,14 @@ class TestCompositeProjects(unittest.TestCase):
             ],
         )
 
-        joined = " ".join(cmd)
-        self.assertIn("/tmp/a:/home/dev/a", joined)
-        self.assertIn("/tmp/b:/home/dev/b", joined)
-        self.assertIn("SKUA_PROJECT_DIR=/home/dev/a", joined)
-        self.assertIn('SKUA_PROJECT_SOURCES=[{"name":"a","path":"/home/dev/a","primary":true},{"name":"b","path":"/home/dev/b","primary":false}]', joined)
+        mounts = _mounts_of(cmd)
+        self.assertIn("/tmp/a:/home/dev/a", mounts)
+        self.assertIn("/tmp/b:/home/dev/b", mounts)
+        env = _env_of(cmd)
+        self.assertEqual(env["SKUA_PROJECT_DIR"], "/home/dev/a")
+        self.assertEqual(env["SKUA_PROJECT_SOURCES"], '[{"name":"a","path":"/home/dev/a","primary":true},{"name":"b","path":"/home/dev/b","primary":false}]')
 
     def test_merge_command_uses_master_defaults_and_unions_image_requirements(self):
-        from skua.commands.merge import cmd_merge
 
         with tempfile.TemporaryDirectory() as tmpdir:
             store = ConfigStore(config_dir=Path(tmpdir))
@@ -299,108 +335,99 @@ class TestCompositeProjects(unittest.TestCase):
 class TestBuildRequiredProjects(unittest.TestCase):
     """Test project selection for lazy project-scoped builds."""
 
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = Path(tempfile.mkdtemp(dir=_RAM_TMP_ROOT))
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        cls.store = ConfigStore(config_dir=cls.tmpdir)
+        cls.store.ensure_dirs()
+
+    def setUp(self):
+        # Start every test from an empty project list in the shared store.
+        for name in self.store.list_resources("Project"):
+            self.store.delete_resource("Project", name)
+
     def test_no_projects_requires_no_projects(self):
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
-            store.ensure_dirs()
-            from skua.commands.build import _required_projects
-            self.assertEqual(_required_projects(store), [])
+        self.assertEqual(_required_projects(self.store), [])
 
     def test_collects_all_projects(self):
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
-            store.ensure_dirs()
-            store.save_resource(Project(name="a", directory="/tmp/a", agent="codex"))
-            store.save_resource(Project(name="b", directory="/tmp/b", agent="claude"))
-            store.save_resource(Project(name="c", directory="/tmp/c", agent="codex"))
-            from skua.commands.build import _required_projects
-            required = _required_projects(store)
-            self.assertEqual([p.name for p in required], ["a", "b", "c"])
+        self.store.save_resources([
+            Project(name="a", directory="/tmp/a", agent="codex"),
+            Project(name="b", directory="/tmp/b", agent="claude"),
+            Project(name="c", directory="/tmp/c", agent="codex"),
+        ])
+        required = _required_projects(self.store)
+        self.assertEqual([p.name for p in required], ["a", "b", "c"])
 
 
 class TestAgentBaseImages(unittest.TestCase):
     """Test agent-specific base image selection."""
 
-    def test_codex_uses_global_default_base_image(self):
-        from skua.docker import base_image_for_agent
-        agent = AgentConfig(name="codex")
-        self.assertEqual(
-            base_image_for_agent("debian:bookworm-slim", agent),
-            "debian:bookworm-slim",
-        )
-
-    def test_non_codex_uses_global_default(self):
-        from skua.docker import base_image_for_agent
-        agent = AgentConfig(name="claude")
-        self.assertEqual(
-            base_image_for_agent("debian:bookworm-slim", agent),
-            "debian:bookworm-slim",
-        )
-
-    def test_agent_override_base_image(self):
-        from skua.docker import base_image_for_agent
-        agent = AgentConfig(
-            name="codex",
-            install=AgentInstallSpec(base_image="ghcr.io/openai/codex-universal:stable"),
-        )
-        self.assertEqual(
-            base_image_for_agent("debian:bookworm-slim", agent),
+    CASES = [
+        # (case, agent, expected)
+        ("codex uses global default", AgentConfig(name="codex"), "debian:bookworm-slim"),
+        ("non-codex uses global default", AgentConfig(name="claude"), "debian:bookworm-slim"),
+        (
+            "agent override",
+            AgentConfig(
+                name="codex",
+                install=AgentInstallSpec(base_image="ghcr.io/openai/codex-universal:stable"),
+            ),
             "ghcr.io/openai/codex-universal:stable",
-        )
-
-    def test_legacy_codex_universal_preset_falls_back_to_default(self):
-        from skua.docker import base_image_for_agent
-        agent = AgentConfig(
-            name="codex",
-            install=AgentInstallSpec(
-                base_image="ghcr.io/openai/codex-universal:latest",
-                commands=[],
-                required_packages=[],
+        ),
+        (
+            "legacy codex-universal preset falls back",
+            AgentConfig(
+                name="codex",
+                install=AgentInstallSpec(
+                    base_image="ghcr.io/openai/codex-universal:latest",
+                    commands=[],
+                    required_packages=[],
+                ),
             ),
-        )
-        self.assertEqual(
-            base_image_for_agent("debian:bookworm-slim", agent),
             "debian:bookworm-slim",
-        )
+        ),
+    ]
+
+    def test_base_image_for_agent(self):
+        for case, agent, expected in self.CASES:
+            with self.subTest(case):
+                self.assertEqual(base_image_for_agent("debian:bookworm-slim", agent), expected)
 
 
 class TestDockerfileAgentInstall(unittest.TestCase):
     """Test agent install behavior in generated Dockerfiles."""
 
-    def test_sets_npm_prefix_for_non_root_global_installs(self):
-        from skua.docker import generate_dockerfile
-        agent = AgentConfig(
+    @classmethod
+    def setUpClass(cls):
+        # Generation is pure templating; render the legacy codex install once.
+        cls.codex_npm_dockerfile = generate_dockerfile(agent=AgentConfig(
             name="codex",
             install=AgentInstallSpec(commands=["npm install -g @openai/codex"]),
-        )
-        dockerfile = generate_dockerfile(agent=agent)
+        ))
+
+    def test_sets_npm_prefix_for_non_root_global_installs(self):
+        dockerfile = self.codex_npm_dockerfile
         self.assertIn('ENV NPM_CONFIG_PREFIX="/home/dev/.local"', dockerfile)
         self.assertIn("USER dev", dockerfile)
 
     def test_codex_default_required_packages_added(self):
-        from skua.docker import generate_dockerfile
         agent = AgentConfig(name="codex", install=AgentInstallSpec(commands=[]))
         dockerfile = generate_dockerfile(agent=agent)
         self.assertIn("nodejs", dockerfile)
         self.assertIn("npm", dockerfile)
 
     def test_codex_legacy_npm_install_command_is_normalized(self):
-        from skua.docker import generate_dockerfile
-        agent = AgentConfig(
-            name="codex",
-            install=AgentInstallSpec(commands=["npm install -g @openai/codex"]),
+        self.assertIn(
+            "npm install -g --prefix /home/dev/.local @openai/codex",
+            self.codex_npm_dockerfile,
         )
-        dockerfile = generate_dockerfile(agent=agent)
-        self.assertIn("npm install -g --prefix /home/dev/.local @openai/codex", dockerfile)
 
     def test_tmux_is_included_in_default_runtime_packages(self):
-        from skua.docker import generate_dockerfile
         dockerfile = generate_dockerfile(agent=AgentConfig(name="claude"))
         self.assertIn("tmux", dockerfile)
 
     def test_resolve_project_image_inputs_layers_extra_project_customizations_on_agent_image(self):
-        from skua.docker import resolve_project_image_inputs
-
         project = Project(
             name="proj",
             agent="claude",
@@ -418,7 +445,6 @@ class TestDockerfileAgentInstall(unittest.TestCase):
 
     @mock.patch("skua.docker.Path.home")
     def test_build_context_hash_changes_when_entrypoint_changes(self, mock_home):
-        from skua.docker import compute_build_context_hash
         with tempfile.TemporaryDirectory() as tmpdir:
             root = Path(tmpdir)
             container_dir = root / "container"
@@ -445,8 +471,6 @@ class TestDockerfileAgentInstall(unittest.TestCase):
 
     @mock.patch("skua.docker._local_image_id")
     def test_build_context_hash_changes_when_layer_base_image_changes(self, mock_image_id):
-        from skua.docker import compute_build_context_hash
-
         mock_image_id.side_effect = ["sha256:first", "sha256:second"]
         with tempfile.TemporaryDirectory() as tmpdir:
             container_dir = Path(tmpdir) / "container"
@@ -469,7 +493,6 @@ class TestDockerfileAgentInstall(unittest.TestCase):
     @mock.patch("skua.docker.compute_build_context_hash")
     @mock.patch("skua.docker._image_label")
     def test_image_matches_build_context_uses_hash_label(self, mock_label, mock_hash):
-        from skua.docker import image_matches_build_context
         mock_hash.return_value = "abc123"
         mock_label.return_value = "abc123"
         self.assertTrue(image_matches_build_context("img", Path("/tmp")))
@@ -480,342 +503,271 @@ class TestDockerfileAgentInstall(unittest.TestCase):
 class TestRunCommandEnv(unittest.TestCase):
     """Test runtime env injection for agent-aware entrypoint behavior."""
 
-    def test_build_run_command_sets_agent_env(self):
-        from skua.docker import build_run_command
+    # Full argv for a directory-less codex project with data dir /tmp/auth.
+    _MINIMAL_CODEX_CMD = [
+        "docker", "run", "-it", "--rm", "--name", "skua-p1",
+        "-e", "SKUA_PROJECT_NAME=p1",
+        "-e", "SKUA_PROJECT_DIR=/home/dev/p1",
+        "-e", "SKUA_IMAGE_REQUEST_FILE=/home/dev/p1/.skua/image-request.yaml",
+        "-e", "SKUA_ADAPT_GUIDE_FILE=/home/dev/p1/.skua/ADAPT.md",
+        "-e", 'SKUA_PROJECT_SOURCES=[{"name":"p1","path":"/home/dev/p1","primary":true}]',
+        "-e", "SKUA_AGENT_NAME=codex",
+        "-e", "SKUA_AGENT_COMMAND=codex",
+        "-e", "SKUA_AGENT_LOGIN_COMMAND=codex login",
+        "-e", "SKUA_AUTH_DIR=.codex",
+        "-e", "SKUA_AUTH_FILES=auth.json",
+        "-e", "SKUA_CREDENTIAL_NAME=(none)",
+        "-v", "/tmp/auth:/home/dev/.codex",
+        "--cap-add=NET_RAW", "--cap-add=NET_ADMIN",
+        "skua-base-codex",
+    ]
+    _TCPDUMP_CAPS = frozenset({"--cap-add=NET_RAW", "--cap-add=NET_ADMIN"})
+
+    @classmethod
+    def setUpClass(cls):
+        # build_run_command only reads these, so every test can share them.
+        cls.env = Environment(name="local-docker")
+        cls.sec = SecurityProfile(name="open")
+        cls.codex_agent = AgentConfig(
+            name="codex",
+            runtime=AgentRuntimeSpec(command="codex"),
+            auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
+        )
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            project = Project(name="p1", directory="", agent="codex")
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            joined = " ".join(cmd)
-            self.assertIn("SKUA_AGENT_NAME=codex", joined)
-            self.assertIn("SKUA_AGENT_COMMAND=codex", joined)
-            self.assertIn("SKUA_AGENT_LOGIN_COMMAND=codex login", joined)
-            self.assertIn("SKUA_AUTH_DIR=.codex", joined)
-            self.assertIn("SKUA_AUTH_FILES=auth.json", joined)
-            self.assertIn("SKUA_CREDENTIAL_NAME=(none)", joined)
-            self.assertIn(f"{data_dir}:/home/dev/.codex", joined)
-            self.assertIn("SKUA_PROJECT_NAME=p1", joined)
-            self.assertIn("SKUA_PROJECT_DIR=/home/dev/p1", joined)
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
 
-    def test_build_run_command_sets_credential_and_ssh_key_env(self):
-        from skua.docker import build_run_command
+    def assertEnvIncludes(self, cmd: list, expected: dict):
+        env = _env_of(cmd)
+        self.assertEqual({key: env.get(key) for key in expected}, expected)
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            key_file = Path(tmpdir) / "id_ed25519"
-            key_file.write_text("test-key")
-            project = Project(
-                name="p1",
-                directory="",
-                agent="codex",
-                credential="cred-main",
-                ssh=ProjectSshSpec(private_key=str(key_file)),
-            )
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            joined = " ".join(cmd)
-            self.assertIn("SKUA_CREDENTIAL_NAME=cred-main", joined)
-            self.assertIn("SKUA_SSH_KEY_NAME=id_ed25519", joined)
+    def test_build_run_command_sets_agent_env(self):
+        project = Project(name="p1", directory="", agent="codex")
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        cmd = build_run_command(project, env, sec, agent, "skua-base-codex", Path("/tmp/auth"))
+        self.assertEqual(cmd, self._MINIMAL_CODEX_CMD)
+
+    def test_build_run_command_sets_credential_and_ssh_key_env(self):
+        key_file = self.tmpdir / "id_ed25519"
+        key_file.write_text("test-key")
+        project = Project(
+            name="p1",
+            directory="",
+            agent="codex",
+            credential="cred-main",
+            ssh=ProjectSshSpec(private_key=str(key_file)),
+        )
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
+        self.assertEnvIncludes(cmd, {
+            "SKUA_CREDENTIAL_NAME": "cred-main",
+            "SKUA_SSH_KEY_NAME": "id_ed25519",
+        })
 
     def test_build_run_command_remote_host_embeds_ssh_material(self):
-        from skua.docker import build_run_command
+        # Serve the key material from memory; only the encoding path is under test.
+        material = {
+            "id_ed25519": _KEY_DATA.encode("utf-8"),
+            "id_ed25519.pub": _PUB_DATA.encode("utf-8"),
+            "known_hosts": _KH_DATA.encode("utf-8"),
+        }
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            key_file = Path(tmpdir) / "id_ed25519"
-            key_data = "test-key"
-            key_file.write_text(key_data)
-            pub_file = Path(tmpdir) / "id_ed25519.pub"
-            pub_data = "ssh-ed25519 AAAA test"
-            pub_file.write_text(pub_data)
-            known_hosts = Path(tmpdir) / "known_hosts"
-            kh_data = "github.com ssh-ed25519 AAAA"
-            known_hosts.write_text(kh_data)
-
-            project = Project(
-                name="p1",
-                directory="",
-                host="docker.example.com",
-                agent="codex",
-                ssh=ProjectSshSpec(private_key=str(key_file)),
-            )
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            joined = " ".join(cmd)
+        project = Project(
+            name="p1",
+            directory="",
+            host="docker.example.com",
+            agent="codex",
+            ssh=ProjectSshSpec(private_key="/keys/id_ed25519"),
+        )
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        data_dir = self.tmpdir / "data"
 
-            expected_key_b64 = base64.b64encode(key_data.encode("utf-8")).decode("ascii")
-            expected_pub_b64 = base64.b64encode(pub_data.encode("utf-8")).decode("ascii")
-            expected_kh_b64 = base64.b64encode(kh_data.encode("utf-8")).decode("ascii")
+        def is_file(path):
+            return path.name in material
 
-            self.assertIn("SKUA_SSH_KEY_NAME=id_ed25519", joined)
-            self.assertIn(f"SKUA_SSH_KEY_B64={expected_key_b64}", joined)
-            self.assertIn(f"SKUA_SSH_PUB_KEY_B64={expected_pub_b64}", joined)
-            self.assertIn(f"SKUA_SSH_KNOWN_HOSTS_B64={expected_kh_b64}", joined)
-            self.assertNotIn("/home/dev/.ssh-mount", joined)
+        def read_bytes(path):
+            return material[path.name]
 
-    def test_build_run_command_mounts_host_directory_name(self):
-        from skua.docker import build_run_command
+        with mock.patch("skua.docker.Path.is_file", autospec=True, side_effect=is_file):
+            with mock.patch("skua.docker.Path.read_bytes", autospec=True, side_effect=read_bytes):
+                cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            host_dir = Path(tmpdir) / "workbench"
-            host_dir.mkdir()
-            project = Project(name="p1", directory=str(host_dir), agent="codex")
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            joined = " ".join(cmd)
-            self.assertIn(f"{host_dir}:/home/dev/workbench", joined)
-            self.assertIn("SKUA_PROJECT_DIR=/home/dev/workbench", joined)
+        self.assertEnvIncludes(cmd, {
+            "SKUA_SSH_KEY_NAME": "id_ed25519",
+            "SKUA_SSH_KEY_B64": _KEY_B64,
+            "SKUA_SSH_PUB_KEY_B64": _PUB_B64,
+            "SKUA_SSH_KNOWN_HOSTS_B64": _KH_B64,
+        })
+        self.assertFalse(any("/home/dev/.ssh-mount" in mount for mount in _mounts_of(cmd)))
 
-    def test_build_run_command_mounts_repo_name_for_repo_projects(self):
-        from skua.docker import build_run_command
+    def test_build_run_command_mounts_host_directory_name(self):
+        host_dir = self.tmpdir / "workbench"
+        host_dir.mkdir()
+        project = Project(name="p1", directory=str(host_dir), agent="codex")
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
+        self.assertIn(f"{host_dir}:/home/dev/workbench", _mounts_of(cmd))
+        self.assertEqual(_env_of(cmd)["SKUA_PROJECT_DIR"], "/home/dev/workbench")
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            clone_dir = Path(tmpdir) / "project-alias"
-            clone_dir.mkdir()
-            project = Project(
-                name="p1",
-                directory=str(clone_dir),
-                repo="git@github.com:acme/platform-api.git",
-                agent="codex",
-            )
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            joined = " ".join(cmd)
-            self.assertIn(f"{clone_dir}:/home/dev/platform-api", joined)
-            self.assertIn("SKUA_PROJECT_DIR=/home/dev/platform-api", joined)
+    def test_build_run_command_mounts_repo_name_for_repo_projects(self):
+        clone_dir = self.tmpdir / "project-alias"
+        clone_dir.mkdir()
+        project = Project(
+            name="p1",
+            directory=str(clone_dir),
+            repo="git@github.com:acme/platform-api.git",
+            agent="codex",
+        )
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
+        self.assertIn(f"{clone_dir}:/home/dev/platform-api", _mounts_of(cmd))
+        self.assertEqual(_env_of(cmd)["SKUA_PROJECT_DIR"], "/home/dev/platform-api")
 
     def test_build_run_command_adds_tcpdump_caps_for_codex(self):
-        from skua.docker import build_run_command
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            project = Project(name="p1", directory="", agent="codex")
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="codex",
-                runtime=AgentRuntimeSpec(command="codex"),
-                auth=AgentAuthSpec(dir=".codex", files=["auth.json"], login_command="codex login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
-            self.assertIn("--cap-add=NET_RAW", cmd)
-            self.assertIn("--cap-add=NET_ADMIN", cmd)
+        project = Project(name="p1", directory="", agent="codex")
+        env, sec, agent = self.env, self.sec, self.codex_agent
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-codex", data_dir)
+        self.assertLessEqual(self._TCPDUMP_CAPS, set(cmd))
 
     def test_build_run_command_adds_tcpdump_caps_for_claude(self):
-        from skua.docker import build_run_command
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            project = Project(name="p1", directory="", agent="claude")
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="claude",
-                runtime=AgentRuntimeSpec(command="claude"),
-                auth=AgentAuthSpec(
-                    dir=".claude",
-                    files=[".credentials.json"],
-                    login_command="claude login",
-                ),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-claude", data_dir)
-            self.assertIn("--cap-add=NET_RAW", cmd)
-            self.assertIn("--cap-add=NET_ADMIN", cmd)
+        project = Project(name="p1", directory="", agent="claude")
+        env, sec = self.env, self.sec
+        agent = AgentConfig(
+            name="claude",
+            runtime=AgentRuntimeSpec(command="claude"),
+            auth=AgentAuthSpec(
+                dir=".claude",
+                files=[".credentials.json"],
+                login_command="claude login",
+            ),
+        )
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-claude", data_dir)
+        self.assertLessEqual(self._TCPDUMP_CAPS, set(cmd))
 
     def test_build_run_command_does_not_add_tcpdump_caps_for_other_agents(self):
-        from skua.docker import build_run_command
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            project = Project(name="p1", directory="", agent="custom")
-            env = Environment(name="local-docker")
-            sec = SecurityProfile(name="open")
-            agent = AgentConfig(
-                name="custom",
-                runtime=AgentRuntimeSpec(command="custom-agent"),
-                auth=AgentAuthSpec(dir=".custom", files=["auth.json"], login_command="custom-agent login"),
-            )
-            data_dir = Path(tmpdir) / "data"
-            cmd = build_run_command(project, env, sec, agent, "skua-base-custom", data_dir)
-            self.assertNotIn("--cap-add=NET_RAW", cmd)
-            self.assertNotIn("--cap-add=NET_ADMIN", cmd)
+        project = Project(name="p1", directory="", agent="custom")
+        env, sec = self.env, self.sec
+        agent = AgentConfig(
+            name="custom",
+            runtime=AgentRuntimeSpec(command="custom-agent"),
+            auth=AgentAuthSpec(dir=".custom", files=["auth.json"], login_command="custom-agent login"),
+        )
+        data_dir = self.tmpdir / "data"
+        cmd = build_run_command(project, env, sec, agent, "skua-base-custom", data_dir)
+        self.assertTrue(self._TCPDUMP_CAPS.isdisjoint(cmd))
 
     def test_detached_run_command_replaces_interactive_flags(self):
-        from skua.commands.run import _detached_run_command
         cmd = ["docker", "run", "-it", "--rm", "--name", "skua-p1", "skua-base"]
         detached = _detached_run_command(cmd)
         self.assertEqual(detached[:4], ["docker", "run", "-d", "--rm"])
         self.assertNotIn("-it", detached)
-        self.assertEqual(detached[-3], "bash")
-        self.assertEqual(detached[-2], "-lc")
-        self.assertIn("tmux", detached[-1])
-        self.assertIn("tmux new-session -d -s", detached[-1])
-        self.assertIn("/bin/bash", detached[-1])
-        self.assertNotIn("/tmp/skua-entrypoint-info.txt", detached[-1])
-        self.assertNotIn("tmux send-keys", detached[-1])
+        self.assertEqual(detached[-3:-1], ["bash", "-lc"])
+        script = detached[-1]
+        self.assertIn("tmux new-session -d -s", script)
+        self.assertIn("/bin/bash", script)
+        self.assertNotIn("/tmp/skua-entrypoint-info.txt", script)
+        self.assertNotIn("tmux send-keys", script)
 
 
 class TestBuildCommandImageDrift(unittest.TestCase):
     """Test skua build rebuilding logic for stale managed images."""
 
-    def _setup_store(self, tmpdir):
-        store = mock.Mock()
-        store.is_initialized.return_value = True
-
-        container_dir = Path(tmpdir) / "container"
-        container_dir.mkdir(parents=True)
-        (container_dir / "entrypoint.sh").write_text("#!/bin/bash\n")
-        store.get_container_dir.return_value = container_dir
+    @classmethod
+    def setUpClass(cls):
+        # The build context is only read, so one container dir serves every test.
+        tmpdir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        cls.container_dir = Path(tmpdir) / "container"
+        cls.container_dir.mkdir()
+        (cls.container_dir / "entrypoint.sh").write_text("#!/bin/bash\n")
 
-        store.load_global.return_value = {
+    def setUp(self):
+        self.project = Project(name="proj", agent="codex")
+        self.store = self._fake_store(self.project)
+        self.mock_store_cls = self._patch("skua.commands.build.ConfigStore", return_value=self.store)
+        self.mock_exists = self._patch("skua.commands.build.image_exists", return_value=True)
+        self.mock_rebuild_needed = self._patch("skua.commands.build.image_rebuild_needed")
+        self.mock_build = self._patch("skua.commands.build.build_image", return_value=(True, ""))
+
+    def _patch(self, target: str, **kwargs):
+        patcher = mock.patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _fake_store(self, project):
+        """Plain stand-in for ConfigStore; only call-checked methods are mocks."""
+        agent = AgentConfig(
+            name="codex",
+            install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex@0.20.0"]),
+        )
+        global_config = {
             "imageName": "skua-base",
             "baseImage": "debian:bookworm-slim",
             "defaults": {"security": "open"},
             "image": {"extraPackages": [], "extraCommands": []},
         }
-        store.load_security.return_value = SecurityProfile(name="open")
-        project = Project(name="proj", agent="codex")
-        agent = AgentConfig(
+        return SimpleNamespace(
+            is_initialized=lambda: True,
+            get_container_dir=lambda: self.container_dir,
+            load_global=lambda: global_config,
+            load_security=lambda name: SecurityProfile(name="open"),
+            load_agent=lambda name: agent,
+            resolve_project=lambda name: project,
+            refresh_agent_preset=mock.Mock(return_value=True),
+        )
+
+    def test_floating_agent_install_forces_cache_busting_rebuild(self):
+        store = self.store
+        floating_agent = AgentConfig(
             name="codex",
-            install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex@0.20.0"]),
+            install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex"]),
         )
-        store.load_agent.return_value = agent
-        return store, project
-
-    @mock.patch("skua.commands.build.build_image")
-    @mock.patch("skua.commands.build.image_rebuild_needed")
-    @mock.patch("skua.commands.build.image_exists")
-    @mock.patch("skua.commands.build.ConfigStore")
-    def test_floating_agent_install_forces_cache_busting_rebuild(
-        self, MockStore, mock_exists, mock_rebuild_needed, mock_build
-    ):
-        from skua.commands.build import cmd_build
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store, project = self._setup_store(tmpdir)
-            project.agent = "codex"
-            store.resolve_project.return_value = project
-            store.load_agent.return_value = AgentConfig(
-                name="codex",
-                install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex"]),
-            )
-            store.refresh_agent_preset = mock.Mock(return_value=True)
-            MockStore.return_value = store
-            mock_exists.return_value = True
-            mock_rebuild_needed.return_value = (True, True, "codex client update available (0.20.0 -> 0.21.0)")
-            mock_build.return_value = (True, "")
-
-            cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
-
-            mock_build.assert_called_once()
-            self.assertTrue(mock_build.call_args.kwargs["pull"])
-            self.assertTrue(mock_build.call_args.kwargs["no_cache"])
-            store.refresh_agent_preset.assert_called_once()
-
-    @mock.patch("skua.commands.build.build_image")
-    @mock.patch("skua.commands.build.image_rebuild_needed")
-    @mock.patch("skua.commands.build.image_exists")
-    @mock.patch("skua.commands.build.ConfigStore")
-    def test_rebuilds_existing_image_when_context_drifted(
-        self, MockStore, mock_exists, mock_rebuild_needed, mock_build
-    ):
-        from skua.commands.build import cmd_build
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store, project = self._setup_store(tmpdir)
-            MockStore.return_value = store
-            store.resolve_project.return_value = project
-            mock_exists.return_value = True
-            mock_rebuild_needed.return_value = (True, False, "build context changed")
-            mock_build.return_value = (True, "")
-
-            cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
-            mock_build.assert_called_once()
-            mock_rebuild_needed.assert_called_once()
-
-    @mock.patch("skua.commands.build.build_image")
-    @mock.patch("skua.commands.build.image_rebuild_needed")
-    @mock.patch("skua.commands.build.image_exists")
-    @mock.patch("skua.commands.build.ConfigStore")
-    def test_skips_rebuild_when_existing_image_matches_context(
-        self, MockStore, mock_exists, mock_rebuild_needed, mock_build
-    ):
-        from skua.commands.build import cmd_build
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store, project = self._setup_store(tmpdir)
-            MockStore.return_value = store
-            store.resolve_project.return_value = project
-            mock_exists.return_value = True
-            mock_rebuild_needed.return_value = (False, False, "")
-            mock_build.return_value = (True, "")
+        store.load_agent = lambda name: floating_agent
+        self.mock_rebuild_needed.return_value = (True, True, "codex client update available (0.20.0 -> 0.21.0)")
 
-            cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
-            mock_build.assert_not_called()
-            mock_rebuild_needed.assert_called_once()
+        cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
 
-    @mock.patch("skua.commands.build.ensure_agent_base_image")
-    @mock.patch("skua.commands.build.build_image")
-    @mock.patch("skua.commands.build.image_rebuild_needed")
-    @mock.patch("skua.commands.build.image_exists")
-    @mock.patch("skua.commands.build.ConfigStore")
-    def test_build_layers_customized_project_on_agent_base(
-        self, MockStore, mock_exists, mock_rebuild_needed, mock_build, mock_ensure_base
-    ):
-        from skua.commands.build import cmd_build
+        self.mock_build.assert_called_once()
+        self.assertTrue(self.mock_build.call_args.kwargs["pull"])
+        self.assertTrue(self.mock_build.call_args.kwargs["no_cache"])
+        store.refresh_agent_preset.assert_called_once()
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store, project = self._setup_store(tmpdir)
-            project.image = ProjectImageSpec(extra_packages=["make"])
-            MockStore.return_value = store
-            store.resolve_project.return_value = project
-            mock_exists.return_value = True
-            mock_rebuild_needed.return_value = (True, False, "build context changed")
-            mock_ensure_base.return_value = ("skua-base-codex", True, False, "")
-            mock_build.return_value = (True, "")
+    def test_rebuilds_existing_image_when_context_drifted(self):
+        self.mock_rebuild_needed.return_value = (True, False, "build context changed")
 
-            cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
+        cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
+        self.mock_build.assert_called_once()
+        self.mock_rebuild_needed.assert_called_once()
+
+    def test_skips_rebuild_when_existing_image_matches_context(self):
+        self.mock_rebuild_needed.return_value = (False, False, "")
+
+        cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
+        self.mock_build.assert_not_called()
+        self.mock_rebuild_needed.assert_called_once()
+
+    @mock.patch("skua.commands.build.ensure_agent_base_image")
+    def test_build_layers_customized_project_on_agent_base(self, mock_ensure_base):
+        self.project.image = ProjectImageSpec(extra_packages=["make"])
+        self.mock_rebuild_needed.return_value = (True, False, "build context changed")
+        mock_ensure_base.return_value = ("skua-base-codex", True, False, "")
+
+        cmd_build(argparse.Namespace(name="proj", verbose=False), lock_project=False)
 
         mock_ensure_base.assert_called_once()
-        self.assertTrue(mock_rebuild_needed.call_args.kwargs["layer_on_base"])
-        self.assertTrue(mock_build.call_args.kwargs["layer_on_base"])
-        self.assertEqual("skua-base-codex", mock_build.call_args.kwargs["base_image"])
+        self.assertTrue(self.mock_rebuild_needed.call_args.kwargs["layer_on_base"])
+        self.assertTrue(self.mock_build.call_args.kwargs["layer_on_base"])
+        self.assertEqual("skua-base-codex", self.mock_build.call_args.kwargs["base_image"])
 
 
 class TestAgentInstallRefresh(unittest.TestCase):
     def test_agent_install_uses_floating_version_detects_unpinned_codex(self):
-        from skua.docker import agent_install_uses_floating_version
-
         agent = AgentConfig(
             name="codex",
             install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex"]),
@@ -823,8 +775,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
         self.assertTrue(agent_install_uses_floating_version(agent))
 
     def test_agent_install_uses_floating_version_ignores_pinned_codex(self):
-        from skua.docker import agent_install_uses_floating_version
-
         agent = AgentConfig(
             name="codex",
             install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex@0.20.0"]),
@@ -834,8 +784,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     @mock.patch("skua.docker._image_label", return_value="0.20.0")
     @mock.patch("skua.docker.latest_agent_client_version", return_value="0.20.0")
     def test_floating_agent_update_available_false_when_versions_match(self, _mock_latest, _mock_label):
-        from skua.docker import floating_agent_update_available
-
         agent = AgentConfig(
             name="codex",
             install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex"]),
@@ -847,8 +795,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     @mock.patch("skua.docker._image_label", return_value="0.20.0")
     @mock.patch("skua.docker.latest_agent_client_version", return_value="0.21.0")
     def test_floating_agent_update_available_true_when_latest_differs(self, _mock_latest, _mock_label):
-        from skua.docker import floating_agent_update_available
-
         agent = AgentConfig(
             name="codex",
             install=AgentInstallSpec(commands=["npm install -g --prefix /home/dev/.local @openai/codex"]),
@@ -859,8 +805,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
         self.assertIn("0.21.0", reason)
 
     def test_latest_agent_client_version_uses_fresh_disk_cache(self):
-        import skua.docker as docker_mod
-
         with tempfile.TemporaryDirectory() as tmpdir:
             cache_path = Path(tmpdir) / "agent-versions.json"
             cache_path.write_text(json.dumps({
@@ -879,8 +823,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
         mock_subprocess.run.assert_not_called()
 
     def test_latest_agent_client_version_falls_back_to_stale_disk_cache_on_lookup_failure(self):
-        import skua.docker as docker_mod
-
         with tempfile.TemporaryDirectory() as tmpdir:
             cache_path = Path(tmpdir) / "agent-versions.json"
             with mock.patch.object(docker_mod, "_AGENT_VERSION_CACHE", {}):
@@ -900,8 +842,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     @mock.patch("skua.docker.subprocess.run")
     @mock.patch("skua.docker.compute_build_context_hash", return_value="ctx-hash")
     def test_build_image_adds_pull_and_no_cache_when_requested(self, _mock_hash, mock_run):
-        from skua.docker import build_image
-
         mock_run.return_value = mock.Mock(returncode=0, stdout="", stderr="")
 
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -924,8 +864,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     @mock.patch("skua.docker.subprocess.run")
     @mock.patch("skua.docker.compute_build_context_hash", return_value="ctx-hash")
     def test_build_image_uses_unique_temp_context_and_cleans_it_up(self, _mock_hash, mock_run):
-        from skua.docker import build_image
-
         mock_run.return_value = mock.Mock(returncode=0, stdout="", stderr="")
 
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -948,8 +886,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     @mock.patch("skua.docker.subprocess.run")
     @mock.patch("skua.docker.compute_build_context_hash", return_value="ctx-hash")
     def test_build_image_layered_project_does_not_require_full_base_assets(self, _mock_hash, mock_run):
-        from skua.docker import build_image
-
         mock_run.return_value = mock.Mock(returncode=0, stdout="", stderr="")
 
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -970,8 +906,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
 
     @mock.patch("skua.docker.image_exists", return_value=False)
     def test_image_rebuild_needed_when_image_missing(self, _mock_exists):
-        from skua.docker import image_rebuild_needed
-
         needs_rebuild, force_refresh, reason = image_rebuild_needed("skua-base-codex", Path("/tmp"))
         self.assertTrue(needs_rebuild)
         self.assertFalse(force_refresh)
@@ -983,7 +917,6 @@ class TestAgentInstallRefresh(unittest.TestCase):
     def test_image_rebuild_needed_when_floating_client_updates(
         self, _mock_exists, _mock_floating, _mock_update
     ):
-        from skua.docker import image_rebuild_needed
 
         agent = AgentConfig(
             name="codex",
@@ -1004,205 +937,208 @@ class TestContainerAttachCommand(unittest.TestCase):
 
     @mock.patch("skua.docker.os.execvp")
     def test_exec_into_container_attaches_cleanly(self, mock_execvp):
-        from skua.docker import exec_into_container
-
         exec_into_container("skua-demo")
         args = mock_execvp.call_args[0][1]
-        joined = " ".join(args)
-        self.assertIn('tmux attach-session -t "$session"', joined)
-        self.assertIn('/home/dev/.entrypoint.d/tmux-attach-banner.sh', joined)
-        self.assertNotIn("tmux send-keys", joined)
+        (script,) = _flag_values(args, "-lc")
+        self.assertIn('tmux attach-session -t "$session"', script)
+        self.assertIn('/home/dev/.entrypoint.d/tmux-attach-banner.sh', script)
+        self.assertNotIn("tmux send-keys", script)
 
 
 class TestAuthSeeding(unittest.TestCase):
     """Test host -> persisted auth file seeding for run command."""
 
-    @mock.patch("skua.commands.credential.Path.home")
-    def test_seed_auth_from_host_prefers_auth_dir(self, mock_home):
-        from skua.commands.run import _seed_auth_from_host
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            home = Path(tmpdir) / "home"
-            data = Path(tmpdir) / "data"
-            (home / ".codex").mkdir(parents=True)
-            data.mkdir(parents=True)
-            (home / ".codex" / "auth.json").write_text('{"token":"abc"}')
-            mock_home.return_value = home
-
-            agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
-            copied = _seed_auth_from_host(data, None, agent)
-            self.assertEqual(copied, 1)
-            self.assertTrue((data / "auth.json").is_file())
-
-    @mock.patch("skua.commands.credential.Path.home")
-    def test_seed_auth_from_host_falls_back_to_home_root(self, mock_home):
-        from skua.commands.run import _seed_auth_from_host
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            home = Path(tmpdir) / "home"
-            data = Path(tmpdir) / "data"
-            home.mkdir(parents=True)
-            data.mkdir(parents=True)
-            (home / ".claude.json").write_text("{}")
-            mock_home.return_value = home
-
-            agent = AgentConfig(name="claude", auth=AgentAuthSpec(dir=".claude", files=[".claude.json"]))
-            copied = _seed_auth_from_host(data, None, agent)
-            self.assertEqual(copied, 1)
-            self.assertTrue((data / ".claude.json").is_file())
-
-    @mock.patch("skua.commands.credential.Path.home")
-    def test_seed_auth_does_not_overwrite_existing_file(self, mock_home):
-        from skua.commands.run import _seed_auth_from_host
+    @classmethod
+    def setUpClass(cls):
+        # Host home layout shared by the tests; copied fresh into each test's tmpdir.
+        cls.pristine_home = Path(tempfile.mkdtemp()) / "home"
+        cls.addClassCleanup(shutil.rmtree, cls.pristine_home.parent, ignore_errors=True)
+        (cls.pristine_home / ".codex").mkdir(parents=True)
+        (cls.pristine_home / ".codex" / "auth.json").write_text('{"token":"host"}')
+        (cls.pristine_home / ".claude.json").write_text("{}")
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            home = Path(tmpdir) / "home"
-            data = Path(tmpdir) / "data"
-            (home / ".codex").mkdir(parents=True)
-            data.mkdir(parents=True)
-            (home / ".codex" / "auth.json").write_text('{"token":"host"}')
-            (data / "auth.json").write_text('{"token":"existing"}')
-            mock_home.return_value = home
-
-            agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
-            copied = _seed_auth_from_host(data, None, agent)
-            self.assertEqual(copied, 0)
-            self.assertIn("existing", (data / "auth.json").read_text())
-
-    @mock.patch("skua.commands.credential.Path.home")
-    def test_seed_auth_overwrites_existing_file_when_enabled(self, mock_home):
-        from skua.commands.run import _seed_auth_from_host
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            home = Path(tmpdir) / "home"
-            data = Path(tmpdir) / "data"
-            (home / ".codex").mkdir(parents=True)
-            data.mkdir(parents=True)
-            (home / ".codex" / "auth.json").write_text('{"token":"host"}')
-            (data / "auth.json").write_text('{"token":"existing"}')
-            mock_home.return_value = home
-
-            agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
-            copied = _seed_auth_from_host(data, None, agent, overwrite=True)
-            self.assertEqual(copied, 1)
-            self.assertIn("host", (data / "auth.json").read_text())
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.home = self.tmpdir / "home"
+        self.data = self.tmpdir / "data"
+        shutil.copytree(self.pristine_home, self.home)
+        self.data.mkdir()
+        home_patcher = mock.patch("skua.commands.credential.Path.home", return_value=self.home)
+        home_patcher.start()
+        self.addCleanup(home_patcher.stop)
+
+    def test_seed_auth_from_host_prefers_auth_dir(self):
+        data = self.data
+        agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
+        copied = _seed_auth_from_host(data, None, agent)
+        self.assertEqual(copied, 1)
+        self.assertTrue((data / "auth.json").is_file())
+
+    def test_seed_auth_from_host_falls_back_to_home_root(self):
+        data = self.data
+        agent = AgentConfig(name="claude", auth=AgentAuthSpec(dir=".claude", files=[".claude.json"]))
+        copied = _seed_auth_from_host(data, None, agent)
+        self.assertEqual(copied, 1)
+        self.assertTrue((data / ".claude.json").is_file())
+
+    def test_seed_auth_does_not_overwrite_existing_file(self):
+        data = self.data
+        (data / "auth.json").write_text('{"token":"existing"}')
+
+        agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
+        copied = _seed_auth_from_host(data, None, agent)
+        self.assertEqual(copied, 0)
+        self.assertIn("existing", (data / "auth.json").read_text())
+
+    def test_seed_auth_overwrites_existing_file_when_enabled(self):
+        data = self.data
+        (data / "auth.json").write_text('{"token":"existing"}')
+
+        agent = AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
+        copied = _seed_auth_from_host(data, None, agent, overwrite=True)
+        self.assertEqual(copied, 1)
+        self.assertIn("host", (data / "auth.json").read_text())
 
 
 class TestCredentialRefreshChecks(unittest.TestCase):
     """Test staleness/missing detection for local credential files."""
 
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        sources_patcher = mock.patch("skua.commands.run.resolve_credential_sources")
+        self.mock_sources = sources_patcher.start()
+        self.addCleanup(sources_patcher.stop)
+
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def _agent() -> AgentConfig:
+        # Shared read-only fixture; the refresh checks never mutate the agent.
         return AgentConfig(name="codex", auth=AgentAuthSpec(dir=".codex", files=["auth.json"]))
 
     @staticmethod
-    def _jwt(payload: dict) -> str:
+    @functools.lru_cache(maxsize=None)
+    def _jwt(**claims) -> str:
         def _enc(obj):
             raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
             return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
-        return f"{_enc({'alg': 'none', 'typ': 'JWT'})}.{_enc(payload)}.sig"
-
-    @mock.patch("skua.commands.run.resolve_credential_sources")
-    def test_refresh_reason_when_no_files_found(self, mock_sources):
-        from skua.commands.run import _credential_refresh_reason
+        return f"{_enc({'alg': 'none', 'typ': 'JWT'})}.{_enc(claims)}.sig"
 
-        mock_sources.return_value = [(Path("/missing/auth.json"), "auth.json")]
+    def test_refresh_reason_when_no_files_found(self):
+        self.mock_sources.return_value = [(Path("/missing/auth.json"), "auth.json")]
         reason = _credential_refresh_reason(cred=None, agent=self._agent())
         self.assertIn("no local credential files", reason)
 
-    @mock.patch("skua.commands.run.resolve_credential_sources")
-    def test_refresh_reason_detects_expired_json(self, mock_sources):
-        from skua.commands.run import _credential_refresh_reason
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth = Path(tmpdir) / "auth.json"
-            auth.write_text('{"expiresAt":"2000-01-01T00:00:00Z"}')
-            mock_sources.return_value = [(auth, "auth.json")]
-            reason = _credential_refresh_reason(
-                cred=None,
-                agent=self._agent(),
-                now=datetime(2026, 1, 1, tzinfo=timezone.utc),
-            )
-            self.assertIn("expired/near-expiry", reason)
-            self.assertIn("auth.json", reason)
-
-    @mock.patch("skua.commands.run.resolve_credential_sources")
-    def test_refresh_reason_allows_future_expiry(self, mock_sources):
-        from skua.commands.run import _credential_refresh_reason
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth = Path(tmpdir) / "auth.json"
-            auth.write_text('{"expiresAt":"2099-01-01T00:00:00Z"}')
-            mock_sources.return_value = [(auth, "auth.json")]
-            reason = _credential_refresh_reason(
-                cred=None,
-                agent=self._agent(),
-                now=datetime(2026, 1, 1, tzinfo=timezone.utc),
-            )
-            self.assertEqual(reason, "")
-
-    @mock.patch("skua.commands.run.resolve_credential_sources")
-    def test_refresh_reason_detects_expired_jwt_token(self, mock_sources):
-        from skua.commands.run import _credential_refresh_reason
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth = Path(tmpdir) / "auth.json"
-            token = self._jwt({"exp": 946684800})  # 2000-01-01T00:00:00Z
-            auth.write_text(json.dumps({"tokens": {"access_token": token}}))
-            mock_sources.return_value = [(auth, "auth.json")]
-            reason = _credential_refresh_reason(
-                cred=None,
-                agent=self._agent(),
-                now=datetime(2026, 1, 1, tzinfo=timezone.utc),
-            )
-            self.assertIn("expired/near-expiry", reason)
+    def test_refresh_reason_detects_expired_json(self):
+        auth = self.tmpdir / "auth.json"
+        auth.write_text('{"expiresAt":"2000-01-01T00:00:00Z"}')
+        self.mock_sources.return_value = [(auth, "auth.json")]
+        reason = _credential_refresh_reason(
+            cred=None,
+            agent=self._agent(),
+            now=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        self.assertIn("expired/near-expiry", reason)
+        self.assertIn("auth.json", reason)
+
+    def test_refresh_reason_allows_future_expiry(self):
+        auth = self.tmpdir / "auth.json"
+        auth.write_text('{"expiresAt":"2099-01-01T00:00:00Z"}')
+        self.mock_sources.return_value = [(auth, "auth.json")]
+        reason = _credential_refresh_reason(
+            cred=None,
+            agent=self._agent(),
+            now=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        self.assertEqual(reason, "")
+
+    def test_refresh_reason_detects_expired_jwt_token(self):
+        auth = self.tmpdir / "auth.json"
+        token = self._jwt(exp=946684800)  # 2000-01-01T00:00:00Z
+        auth.write_text(json.dumps({"tokens": {"access_token": token}}))
+        self.mock_sources.return_value = [(auth, "auth.json")]
+        reason = _credential_refresh_reason(
+            cred=None,
+            agent=self._agent(),
+            now=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        self.assertIn("expired/near-expiry", reason)
+
+    def test_refresh_reason_allows_future_jwt_token(self):
+        auth = self.tmpdir / "auth.json"
+        token = self._jwt(exp=4070908800)  # 2099-01-01T00:00:00Z
+        auth.write_text(json.dumps({"tokens": {"id_token": token}}))
+        self.mock_sources.return_value = [(auth, "auth.json")]
+        reason = _credential_refresh_reason(
+            cred=None,
+            agent=self._agent(),
+            now=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        self.assertEqual(reason, "")
 
-    @mock.patch("skua.commands.run.resolve_credential_sources")
-    def test_refresh_reason_allows_future_jwt_token(self, mock_sources):
-        from skua.commands.run import _credential_refresh_reason
+    def test_credential_file_expiry_reparses_only_after_file_changes(self):
+        auth = self.tmpdir / "auth.json"
+        auth.write_text('{"expiresAt":"2099-01-01T00:00:00Z"}')
+        with mock.patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as mock_read:
+            first = _credential_file_expiry(auth)
+            second = _credential_file_expiry(auth)
+            self.assertEqual(mock_read.call_count, 1)
+            self.assertEqual(second, first)
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth = Path(tmpdir) / "auth.json"
-            token = self._jwt({"exp": 4070908800})  # 2099-01-01T00:00:00Z
-            auth.write_text(json.dumps({"tokens": {"id_token": token}}))
-            mock_sources.return_value = [(auth, "auth.json")]
-            reason = _credential_refresh_reason(
-                cred=None,
-                agent=self._agent(),
-                now=datetime(2026, 1, 1, tzinfo=timezone.utc),
-            )
-            self.assertEqual(reason, "")
+            auth.write_text('{"expiresAt":"2000-01-01T00:00:00Z"}')
+            os.utime(auth, ns=(0, 0))
+            third = _credential_file_expiry(auth)
+        self.assertEqual(mock_read.call_count, 2)
+        self.assertEqual(third, datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+    def test_credential_file_expiry_reparses_same_size_replace_with_same_mtime(self):
+        auth = self.tmpdir / "auth.json"
+        auth.write_text('{"expiresAt":"2099-01-01T00:00:00Z"}')
+        before = auth.stat()
+        self.assertEqual(_credential_file_expiry(auth), datetime(2099, 1, 1, tzinfo=timezone.utc))
+
+        replacement = self.tmpdir / "auth.json.tmp"
+        replacement.write_text('{"expiresAt":"2000-01-01T00:00:00Z"}')
+        os.utime(replacement, ns=(before.st_atime_ns, before.st_mtime_ns))
+        os.replace(replacement, auth)
+        self.assertEqual(_credential_file_expiry(auth), datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+    def test_jwt_expiry_is_decoded_once_per_token(self):
+        _jwt_expiry_datetime.cache_clear()
+        self.addCleanup(_jwt_expiry_datetime.cache_clear)
+        token = self._jwt(exp=4070908800)
+        with mock.patch("skua.commands.run._json_loads", wraps=json.loads) as mock_loads:
+            first = _jwt_expiry_datetime(token)
+            second = _jwt_expiry_datetime(token)
+        self.assertEqual(first, datetime(2099, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(second, first)
+        mock_loads.assert_called_once()
 
 
 class TestGitUrlValidation(unittest.TestCase):
     """Test the _is_git_url helper."""
 
-    def test_https_url(self):
-        self.assertTrue(_is_git_url("https://github.com/user/repo.git"))
-
-    def test_http_url(self):
-        self.assertTrue(_is_git_url("http://github.com/user/repo.git"))
-
-    def test_git_protocol(self):
-        self.assertTrue(_is_git_url("git://github.com/user/repo.git"))
-
-    def test_ssh_scp_style(self):
-        self.assertTrue(_is_git_url("git@github.com:user/repo.git"))
-
-    def test_ssh_url(self):
-        self.assertTrue(_is_git_url("ssh://git@github.com/user/repo.git"))
-
-    def test_plain_string_rejected(self):
-        self.assertFalse(_is_git_url("foo"))
-
-    def test_local_path_rejected(self):
-        self.assertFalse(_is_git_url("/tmp/some/repo"))
-
-    def test_relative_path_rejected(self):
-        self.assertFalse(_is_git_url("some/repo"))
-
-    def test_ftp_rejected(self):
-        self.assertFalse(_is_git_url("ftp://server/repo.git"))
+    CASES = [
+        # (url, looks like a git URL)
+        ("https://github.com/user/repo.git", True),
+        ("http://github.com/user/repo.git", True),
+        ("git://github.com/user/repo.git", True),
+        ("git@github.com:user/repo.git", True),                 # SCP-style SSH
+        ("ssh://git@github.com/user/repo.git", True),
+        ("org-123@github.com:user/repo.git", True),             # SCP-style, custom user
+        ("foo", False),
+        ("/tmp/some/repo", False),                              # local path
+        ("some/repo", False),                                   # relative path
+        ("ftp://server/repo.git", False),
+        ("https://", False),                                    # scheme only
+        ("https://github.com/user/my repo.git", False),         # embedded whitespace
+    ]
+
+    def test_is_git_url(self):
+        for url, expected in self.CASES:
+            with self.subTest(url=url):
+                self.assertEqual(_is_git_url(url), expected)
 
     def test_https_repo_is_normalized_to_ssh(self):
         self.assertEqual(
@@ -1224,50 +1160,48 @@ class TestGitUrlValidation(unittest.TestCase):
 class TestAddMutualExclusivity(unittest.TestCase):
     """Test that --dir and --repo are mutually exclusive in cmd_add."""
 
-    def _make_args(self, **kwargs):
-        defaults = dict(
-            name="test-proj",
-            dir=None,
-            repo=None,
-            ssh_key="",
-            env=None,
-            security=None,
-            agent=None,
-            credential=None,
-            quick=True,
-            no_prompt=True,
-        )
-        defaults.update(kwargs)
-        return argparse.Namespace(**defaults)
+    _DEFAULT_ARGS = argparse.Namespace(
+        name="test-proj",
+        dir=None,
+        repo=None,
+        ssh_key="",
+        env=None,
+        security=None,
+        agent=None,
+        credential=None,
+        quick=True,
+        no_prompt=True,
+    )
 
-    @mock.patch("skua.commands.add.ConfigStore")
-    def test_dir_and_repo_both_set_errors(self, MockStore):
-        """Providing both --dir and --repo should exit with error."""
-        mock_store = MockStore.return_value
-        mock_store.is_initialized.return_value = True
-        mock_store.load_project.return_value = None
+    def setUp(self):
+        patcher = mock.patch("skua.commands.add.ConfigStore")
+        self.MockStore = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_store = self.MockStore.return_value
+        self.mock_store.is_initialized.return_value = True
+        self.mock_store.load_project.return_value = None
 
-        from skua.commands.add import cmd_add
+    def _make_args(self, **kwargs):
+        args = copy.copy(self._DEFAULT_ARGS)
+        vars(args).update(kwargs)
+        return args
 
+    def test_dir_and_repo_both_set_errors(self):
+        """Providing both --dir and --repo should exit with error."""
         args = self._make_args(dir="/tmp/foo", repo="https://github.com/u/r.git")
         with self.assertRaises(SystemExit) as ctx:
             cmd_add(args)
         self.assertEqual(ctx.exception.code, 1)
 
-    @mock.patch("skua.commands.add.ConfigStore")
-    def test_repo_only_accepted(self, MockStore):
+    def test_repo_only_accepted(self):
         """Providing only --repo should not error on mutual exclusivity."""
-        mock_store = MockStore.return_value
-        mock_store.is_initialized.return_value = True
-        mock_store.load_project.return_value = None
+        mock_store = self.mock_store
         mock_store.load_global.return_value = {"defaults": {}}
         mock_store.list_resources.side_effect = lambda kind: ["claude"] if kind == "AgentConfig" else []
         mock_store.load_agent.return_value = AgentConfig(name="claude")
         mock_store.load_credential.return_value = Credential(name="cred1", agent="claude")
         mock_store.load_environment.return_value = None
 
-        from skua.commands.add import cmd_add
-
         args = self._make_args(repo="https://github.com/u/r.git", credential="cred1")
         # Should not raise SystemExit for mutual exclusivity
         # (may raise for other reasons like missing environment, but that's fine)
@@ -1283,32 +1217,20 @@ class TestAddMutualExclusivity(unittest.TestCase):
         self.assertEqual(saved_project.repo, "git@github.com:u/r.git")
         self.assertEqual(saved_project.directory, "")
 
-    @mock.patch("skua.commands.add.ConfigStore")
-    def test_invalid_repo_url_errors(self, MockStore):
+    def test_invalid_repo_url_errors(self):
         """Providing a non-URL string as --repo should exit with error."""
-        mock_store = MockStore.return_value
-        mock_store.is_initialized.return_value = True
-        mock_store.load_project.return_value = None
-
-        from skua.commands.add import cmd_add
-
         args = self._make_args(repo="not-a-url")
         with self.assertRaises(SystemExit) as ctx:
             cmd_add(args)
         self.assertEqual(ctx.exception.code, 1)
 
-    @mock.patch("skua.commands.add.ConfigStore")
-    def test_unknown_agent_errors(self, MockStore):
+    def test_unknown_agent_errors(self):
         """Providing an unknown --agent should exit with error."""
-        mock_store = MockStore.return_value
-        mock_store.is_initialized.return_value = True
-        mock_store.load_project.return_value = None
+        mock_store = self.mock_store
         mock_store.load_global.return_value = {"defaults": {}}
         mock_store.list_resources.return_value = ["claude", "codex"]
         mock_store.load_agent.return_value = None
 
-        from skua.commands.add import cmd_add
-
         args = self._make_args(agent="missing-agent")
         with self.assertRaises(SystemExit) as ctx:
             cmd_add(args)
@@ -1318,134 +1240,146 @@ class TestAddMutualExclusivity(unittest.TestCase):
 class TestRunRepoClone(unittest.TestCase):
     """Test that cmd_run clones repos correctly."""
 
-    def test_clone_invoked_when_repo_dir_missing(self):
-        """When project.repo is set and clone dir doesn't exist, git clone is called."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        cls.store = ConfigStore(config_dir=cls.tmpdir)
+        cls.clone_dir = cls.store.repo_dir("test-proj")
+        run_patcher = mock.patch("skua.commands.run.subprocess.run")
+        cls.mock_run = run_patcher.start()
+        cls.addClassCleanup(run_patcher.stop)
 
-            project = Project(
-                name="test-proj",
-                repo="https://github.com/user/repo.git",
-                directory="",
-                ssh=ProjectSshSpec(),
-            )
+    def setUp(self):
+        # Clone directories are the only state these tests create.
+        shutil.rmtree(self.store.repos_dir(), ignore_errors=True)
+        self.mock_run.reset_mock()
+        self.mock_run.return_value = mock.Mock(returncode=0)
 
-            clone_dir = store.repo_dir("test-proj")
-            self.assertFalse(clone_dir.exists())
+    def test_clone_invoked_when_repo_dir_missing(self):
+        """When project.repo is set and clone dir doesn't exist, git clone is called."""
+        project = Project(
+            name="test-proj",
+            repo="https://github.com/user/repo.git",
+            directory="",
+            ssh=ProjectSshSpec(),
+        )
 
-            # Mock subprocess.run to simulate git clone
-            with mock.patch("skua.commands.run.subprocess.run") as mock_run:
-                mock_run.return_value = mock.Mock(returncode=0)
+        clone_dir = self.clone_dir
+        self.assertFalse(clone_dir.exists())
 
-                # Simulate the clone logic from cmd_run
-                if project.repo:
-                    if not clone_dir.exists():
-                        clone_cmd = ["git", "clone"]
-                        clone_cmd += [project.repo, str(clone_dir)]
-                        subprocess.run(clone_cmd, check=True)
-                    project.directory = str(clone_dir)
+        # Simulate the clone logic from cmd_run
+        if project.repo:
+            if not clone_dir.exists():
+                clone_cmd = _git_clone_command(project.repo, clone_dir)
+                subprocess.run(clone_cmd, check=True)
+            project.directory = str(clone_dir)
 
-                mock_run.assert_called_once_with(
-                    ["git", "clone", "https://github.com/user/repo.git", str(clone_dir)],
-                    check=True,
-                )
-                self.assertEqual(project.directory, str(clone_dir))
+        self.mock_run.assert_called_once_with(
+            ["git", "clone", "https://github.com/user/repo.git", str(clone_dir)],
+            check=True,
+        )
+        self.assertEqual(project.directory, str(clone_dir))
 
     def test_clone_skipped_when_repo_dir_exists(self):
         """When clone directory already exists, git clone is not called."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
-
-            project = Project(
-                name="test-proj",
-                repo="https://github.com/user/repo.git",
-                directory="",
-                ssh=ProjectSshSpec(),
-            )
+        project = Project(
+            name="test-proj",
+            repo="https://github.com/user/repo.git",
+            directory="",
+            ssh=ProjectSshSpec(),
+        )
 
-            clone_dir = store.repo_dir("test-proj")
-            clone_dir.mkdir(parents=True)
+        clone_dir = self.clone_dir
+        clone_dir.mkdir(parents=True)
 
-            with mock.patch("skua.commands.run.subprocess.run") as mock_run:
-                # Simulate the clone logic from cmd_run
-                if project.repo:
-                    if not clone_dir.exists():
-                        subprocess.run(
-                            ["git", "clone", project.repo, str(clone_dir)],
-                            check=True,
-                        )
-                    project.directory = str(clone_dir)
+        # Simulate the clone logic from cmd_run
+        if project.repo:
+            if not clone_dir.exists():
+                subprocess.run(_git_clone_command(project.repo, clone_dir), check=True)
+            project.directory = str(clone_dir)
 
-                mock_run.assert_not_called()
-                self.assertEqual(project.directory, str(clone_dir))
+        self.mock_run.assert_not_called()
+        self.assertEqual(project.directory, str(clone_dir))
 
     def test_clone_uses_ssh_key_when_set(self):
-        """When SSH key is set, git clone uses core.sshCommand."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
+        """When SSH key is set, git clone uses and persists core.sshCommand."""
+        project = Project(
+            name="test-proj",
+            repo="git@github.com:user/repo.git",
+            directory="",
+            ssh=ProjectSshSpec(private_key="/home/user/.ssh/id_rsa"),
+        )
 
-            project = Project(
-                name="test-proj",
-                repo="git@github.com:user/repo.git",
-                directory="",
-                ssh=ProjectSshSpec(private_key="/home/user/.ssh/id_rsa"),
-            )
+        clone_dir = self.clone_dir
 
-            clone_dir = store.repo_dir("test-proj")
+        # Simulate the clone logic from cmd_run
+        if project.repo:
+            if not clone_dir.exists():
+                clone_cmd = _git_clone_command(project.repo, clone_dir, project.ssh.private_key)
+                subprocess.run(clone_cmd, check=True)
+            project.directory = str(clone_dir)
 
-            with mock.patch("skua.commands.run.subprocess.run") as mock_run:
-                mock_run.return_value = mock.Mock(returncode=0)
+        expected_ssh = "ssh -i /home/user/.ssh/id_rsa -o StrictHostKeyChecking=no"
+        self.mock_run.assert_called_once_with(
+            [
+                "git", "clone", "-c", f"core.sshCommand={expected_ssh}",
+                "git@github.com:user/repo.git", str(clone_dir),
+            ],
+            check=True,
+        )
 
-                # Simulate the clone logic from cmd_run
-                if project.repo:
-                    if not clone_dir.exists():
-                        clone_cmd = ["git", "clone"]
-                        if project.ssh.private_key:
-                            ssh_cmd = f"ssh -i {project.ssh.private_key} -o StrictHostKeyChecking=no"
-                            clone_cmd = ["git", "-c", f"core.sshCommand={ssh_cmd}", "clone"]
-                        clone_cmd += [project.repo, str(clone_dir)]
-                        subprocess.run(clone_cmd, check=True)
-                    project.directory = str(clone_dir)
+    def test_partial_clone_is_opt_in(self):
+        """--filter=blob:none is only passed when the project asks for it."""
+        project = Project(
+            name="test-proj",
+            repo="git@github.com:user/repo.git",
+            git=ProjectGitSpec(partial_clone=True),
+            ssh=ProjectSshSpec(private_key="/home/user/.ssh/id_rsa"),
+        )
+        clone_dir = self.clone_dir
+
+        clone_cmd = _git_clone_command(
+            project.repo, clone_dir, project.ssh.private_key, partial=project.git.partial_clone,
+        )
 
-                expected_ssh = "ssh -i /home/user/.ssh/id_rsa -o StrictHostKeyChecking=no"
-                mock_run.assert_called_once_with(
-                    [
-                        "git", "-c", f"core.sshCommand={expected_ssh}", "clone",
-                        "git@github.com:user/repo.git", str(clone_dir),
-                    ],
-                    check=True,
-                )
+        expected_ssh = "ssh -i /home/user/.ssh/id_rsa -o StrictHostKeyChecking=no"
+        self.assertEqual(clone_cmd, [
+            "git", "clone", "-c", f"core.sshCommand={expected_ssh}", "--filter=blob:none",
+            "git@github.com:user/repo.git", str(clone_dir),
+        ])
+        self.assertNotIn("--filter=blob:none", _git_clone_command(project.repo, clone_dir))
 
 
 class TestListShowsRepo(unittest.TestCase):
     """Test that skua list source labels are clear and stable."""
 
     def test_source_prefers_local_directory(self):
-        from skua.commands.list_cmd import _format_project_source
         p = Project(name="test", directory=str(Path.home() / "repo"), repo="https://github.com/user/repo.git")
         source = _format_project_source(p)
         self.assertEqual(source, "LOCAL:~/repo")
 
     def test_source_formats_github_https(self):
-        from skua.commands.list_cmd import _format_project_source
         p = Project(name="test", repo="https://github.com/user/repo.git", directory="")
         source = _format_project_source(p)
         self.assertEqual(source, "GITHUB:/user/repo")
 
     def test_source_formats_github_ssh(self):
-        from skua.commands.list_cmd import _format_project_source
         p = Project(name="test", repo="git@github.com:user/repo.git", directory="")
         source = _format_project_source(p)
         self.assertEqual(source, "GITHUB:/user/repo")
 
+    def test_source_formats_github_url_with_extra_path(self):
+        p = Project(name="test", repo="https://github.com/user/repo/tree/main", directory="")
+        source = _format_project_source(p)
+        self.assertEqual(source, "GITHUB:/user/repo")
+
     def test_source_falls_back_to_generic_repo(self):
-        from skua.commands.list_cmd import _format_project_source
         p = Project(name="test", repo="https://gitlab.com/user/repo.git", directory="")
         source = _format_project_source(p)
         self.assertEqual(source, "REPO:https://gitlab.com/user/repo.git")
 
     def test_source_none_when_both_empty(self):
-        from skua.commands.list_cmd import _format_project_source
         p = Project(name="test")
         source = _format_project_source(p)
         self.assertEqual(source, "(none)")
@@ -1454,48 +1388,55 @@ class TestListShowsRepo(unittest.TestCase):
 class TestProjectYamlPersistence(unittest.TestCase):
     """Test saving and loading a project with repo through ConfigStore."""
 
-    def test_save_and_load_project_with_repo(self):
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
-            store.ensure_dirs()
+    # Shared field values; each test replaces name/source fields on a copy.
+    _BASE = Project(
+        name="",
+        environment="local-docker",
+        security="open",
+        agent="claude",
+        git=ProjectGitSpec(),
+        ssh=ProjectSshSpec(),
+        image=ProjectImageSpec(),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        # Each test saves a differently named project, so one store is enough.
+        cls.tmpdir = Path(tempfile.mkdtemp(dir=_RAM_TMP_ROOT))
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        cls.store = ConfigStore(config_dir=cls.tmpdir)
+        cls.store.ensure_dirs()
 
-            project = Project(
-                name="my-repo-proj",
-                repo="https://github.com/user/repo.git",
-                directory="",
-                environment="local-docker",
-                security="open",
-                agent="claude",
-                git=ProjectGitSpec(),
-                ssh=ProjectSshSpec(private_key="/home/user/.ssh/id_rsa"),
-                image=ProjectImageSpec(),
-            )
-            store.save_resource(project)
+    def test_save_and_load_project_with_repo(self):
+        project = dataclasses.replace(
+            self._BASE,
+            name="my-repo-proj",
+            repo="https://github.com/user/repo.git",
+            ssh=ProjectSshSpec(private_key="/home/user/.ssh/id_rsa"),
+        )
+        self.store.save_resource(project)
 
-            loaded = store.load_project("my-repo-proj")
-            self.assertIsNotNone(loaded)
-            self.assertEqual(loaded.repo, "https://github.com/user/repo.git")
-            self.assertEqual(loaded.directory, "")
-            self.assertEqual(loaded.name, "my-repo-proj")
-            self.assertEqual(loaded.ssh.private_key, "/home/user/.ssh/id_rsa")
+        loaded = self.store.load_project("my-repo-proj")
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.repo, "https://github.com/user/repo.git")
+        self.assertEqual(loaded.directory, "")
+        self.assertEqual(loaded.name, "my-repo-proj")
+        self.assertEqual(loaded.ssh.private_key, "/home/user/.ssh/id_rsa")
 
     def test_save_and_load_project_without_repo(self):
         """Projects without repo should still work (backwards compatible)."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            store = ConfigStore(config_dir=Path(tmpdir))
-            store.ensure_dirs()
+        project = dataclasses.replace(self._BASE, name="local-proj", directory="/tmp/my-code")
+        self.store.save_resource(project)
 
-            project = Project(
-                name="local-proj",
-                directory="/tmp/my-code",
-                environment="local-docker",
-            )
-            store.save_resource(project)
+        loaded = self.store.load_project("local-proj")
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.repo, "")
+        self.assertEqual(loaded.directory, "/tmp/my-code")
 
-            loaded = store.load_project("local-proj")
-            self.assertIsNotNone(loaded)
-            self.assertEqual(loaded.repo, "")
-            self.assertEqual(loaded.directory, "/tmp/my-code")
+    def test_ensure_dirs_skips_mkdir_once_ensured(self):
+        with mock.patch("skua.config.loader.Path.mkdir") as mock_mkdir:
+            self.store.ensure_dirs()
+        mock_mkdir.assert_not_called()
 
 
 class TestDescribeIncludesRepo(unittest.TestCase):
@@ -1513,9 +1454,6 @@ class TestValidationWithRepo(unittest.TestCase):
 
     def test_no_directory_warning_with_repo_only(self):
         """A project with repo but no directory should not warn about no directory."""
-        from skua.config.resources import Environment, SecurityProfile, AgentConfig
-        from skua.config.validation import validate_project
-
         project = Project(name="test", repo="https://github.com/u/r.git")
         env = Environment(name="local-docker")
         sec = SecurityProfile(name="open")
@@ -1523,9 +1461,18 @@ class TestValidationWithRepo(unittest.TestCase):
 
         result = validate_project(project, env, sec, agent)
         # Repo-only projects are valid at add time; directory is set at runtime.
-        dir_warnings = [w for w in result.warnings if "no directory" in w]
+        dir_warnings = [w for w in result.warnings if w.code == ISSUE_NO_DIRECTORY]
         self.assertEqual(dir_warnings, [])
 
+    def test_no_directory_warning_has_stable_code(self):
+        project = Project(name="test")
+        result = validate_project(
+            project, Environment(name="local-docker"), SecurityProfile(name="open"), AgentConfig(name="claude"),
+        )
+        codes = [w.code for w in result.warnings]
+        self.assertIn(ISSUE_NO_DIRECTORY, codes)
+        self.assertIn("project has no directory set", result.warnings)
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -2,81 +2,121 @@
 # SPDX-License-Identifier: BUSL-1.1
 """Tests for remote-Docker SSH preflight checks in `skua run`."""
 
+import dataclasses
 import unittest
 import os
+import shutil
+import sys
 import tempfile
+from collections import deque
 from pathlib import Path
 from types import SimpleNamespace
 from unittest import mock
 
-from skua.config.resources import Project, Environment, SecurityProfile, AgentConfig
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from skua.config.resources import Project, ProjectSshSpec, Environment, SecurityProfile, AgentConfig
+from skua.commands import run as run_mod
+from skua.commands.run import (
+    _clone_repo_into_remote_volume,
+    _configure_remote_docker_transport,
+    _ensure_local_ssh_client_for_remote_docker,
+    _find_non_snap_docker_binary,
+    _is_snap_binary,
+    _prompt_remote_docker_recovery_action,
+    _seed_auth_into_remote_volume,
+    cmd_run,
+)
+
+
+# Environment variables the remote Docker transport helpers rewrite.
+_TRANSPORT_ENV_KEYS = ("DOCKER_HOST", "SKUA_DOCKER_TRANSPORT", "SKUA_DOCKER_REMOTE_HOST", "PATH")
+
+# Shared project fixtures; tests that need a variant use dataclasses.replace.
+_REMOTE_PROJECT = Project(name="qar", host="docker.example.com")
+_REPO_PROJECT = Project(name="qar", repo="git@github.com:org/repo.git")
+
+# The single `ssh -V` probe the preflight check runs against a healthy client.
+_SSH_VERSION_CALL = mock.call(["/usr/bin/ssh", "-V"], capture_output=True, text=True, check=False)
+
+
+def _restore_env_var(key: str, value):
+    if value is None:
+        os.environ.pop(key, None)
+    else:
+        os.environ[key] = value
+
+
+def _preserve_transport_env(test: unittest.TestCase):
+    """Restore the transport env vars to their current values when ``test`` ends."""
+    for key in _TRANSPORT_ENV_KEYS:
+        test.addCleanup(_restore_env_var, key, os.environ.get(key))
+
+
+def _probe_sequence(*results):
+    """Return a probe side effect that hands out ``results`` in call order."""
+    return deque(results).popleft
+
+
+def _patch_transport_helpers():
+    """Patch the collaborators of `_configure_remote_docker_transport` in one step.
+
+    The decorated test receives the mocks as keyword arguments keyed by name.
+    """
+    return mock.patch.multiple(
+        run_mod,
+        _prefer_non_snap_docker_on_path=mock.Mock(return_value=""),
+        _probe_current_docker_connection=mock.DEFAULT,
+        _prompt_remote_docker_recovery_action=mock.DEFAULT,
+        _run_docker_cli_installer=mock.DEFAULT,
+        _enable_ssh_docker_wrapper=mock.DEFAULT,
+    )
 
 
 class TestRemoteDockerSshPreflight(unittest.TestCase):
     """Validate local SSH preflight behavior for remote Docker hosts."""
 
     def setUp(self):
-        self._orig_env = os.environ.copy()
-
-    def tearDown(self):
-        os.environ.clear()
-        os.environ.update(self._orig_env)
+        _preserve_transport_env(self)
 
     def test_missing_ssh_binary_exits(self):
-        from skua.commands.run import _ensure_local_ssh_client_for_remote_docker
-
-        with mock.patch("skua.commands.run.shutil.which", return_value=None):
+        with mock.patch.object(run_mod.shutil, "which", return_value=None):
             with self.assertRaises(SystemExit) as ctx:
                 _ensure_local_ssh_client_for_remote_docker("docker.example.com")
             self.assertEqual(ctx.exception.code, 1)
 
     def test_non_executable_ssh_binary_exits(self):
-        from skua.commands.run import _ensure_local_ssh_client_for_remote_docker
-
-        with mock.patch("skua.commands.run.shutil.which", return_value="/usr/bin/ssh"):
-            with mock.patch("skua.commands.run.os.access", return_value=False):
+        with mock.patch.object(run_mod.shutil, "which", return_value="/usr/bin/ssh"):
+            with mock.patch.object(run_mod.os, "access", return_value=False):
                 with self.assertRaises(SystemExit) as ctx:
                     _ensure_local_ssh_client_for_remote_docker("docker.example.com")
                 self.assertEqual(ctx.exception.code, 1)
 
     def test_permission_denied_on_ssh_exec_exits(self):
-        from skua.commands.run import _ensure_local_ssh_client_for_remote_docker
-
-        with mock.patch("skua.commands.run.shutil.which", return_value="/usr/bin/ssh"):
-            with mock.patch("skua.commands.run.os.access", return_value=True):
-                with mock.patch("skua.commands.run.subprocess.run", side_effect=PermissionError):
+        with mock.patch.object(run_mod.shutil, "which", return_value="/usr/bin/ssh"):
+            with mock.patch.object(run_mod.os, "access", return_value=True):
+                with mock.patch.object(run_mod.subprocess, "run", side_effect=PermissionError):
                     with self.assertRaises(SystemExit) as ctx:
                         _ensure_local_ssh_client_for_remote_docker("docker.example.com")
                     self.assertEqual(ctx.exception.code, 1)
 
     def test_healthy_ssh_binary_passes(self):
-        from skua.commands.run import _ensure_local_ssh_client_for_remote_docker
-
-        with mock.patch("skua.commands.run.shutil.which", return_value="/usr/bin/ssh"):
-            with mock.patch("skua.commands.run.os.access", return_value=True):
-                with mock.patch("skua.commands.run.subprocess.run") as mock_run:
+        with mock.patch.object(run_mod.shutil, "which", return_value="/usr/bin/ssh"):
+            with mock.patch.object(run_mod.os, "access", return_value=True):
+                with mock.patch.object(run_mod.subprocess, "run") as mock_run:
                     _ensure_local_ssh_client_for_remote_docker("docker.example.com")
-                    mock_run.assert_called_once_with(
-                        ["/usr/bin/ssh", "-V"],
-                        capture_output=True,
-                        text=True,
-                        check=False,
-                    )
+                    self.assertEqual(mock_run.call_args_list, [_SSH_VERSION_CALL])
 
     def test_cmd_run_invokes_preflight_for_remote_host(self):
-        from skua.commands.run import cmd_run
-
-        fake_project = Project(name="qar", host="docker.example.com")
-
-        with mock.patch("skua.commands.run.ConfigStore") as MockStore:
+        with mock.patch.object(run_mod, "ConfigStore") as MockStore:
             store = MockStore.return_value
-            store.resolve_project.return_value = fake_project
+            store.resolve_project.return_value = _REMOTE_PROJECT
 
-            with mock.patch("skua.commands.run._ensure_local_ssh_client_for_remote_docker") as mock_preflight:
-                with mock.patch("skua.commands.run._configure_remote_docker_transport"):
-                    with mock.patch("skua.commands.run.is_container_running", return_value=True):
-                        with mock.patch("skua.commands.run.exec_into_container"):
-                            with mock.patch("builtins.input", return_value="n"):
+            with mock.patch.object(run_mod, "_ensure_local_ssh_client_for_remote_docker") as mock_preflight:
+                with mock.patch.object(run_mod, "_configure_remote_docker_transport"):
+                    with mock.patch.object(run_mod, "is_container_running", return_value=True):
+                        with mock.patch.object(run_mod, "exec_into_container"):
+                            with mock.patch.object(run_mod, "input", create=True, return_value="n"):
                                 cmd_run(SimpleNamespace(name="qar"), lock_project=False)
                                 mock_preflight.assert_called_once_with("docker.example.com")
 
@@ -85,160 +125,115 @@ class TestRemoteDockerTransportFallback(unittest.TestCase):
     """Validate remote transport fallback sequence for `skua run`."""
 
     def setUp(self):
-        self._orig_env = os.environ.copy()
-
-    def tearDown(self):
-        os.environ.clear()
-        os.environ.update(self._orig_env)
-
-    def test_configure_transport_keeps_docker_host_when_probe_succeeds(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch("skua.commands.run._probe_current_docker_connection", return_value=(True, "")):
-                with mock.patch("skua.commands.run._enable_ssh_docker_wrapper") as mock_wrapper:
-                    _configure_remote_docker_transport("docker.example.com")
-                    self.assertEqual(
-                        "ssh://docker.example.com",
-                        os.environ.get("DOCKER_HOST", ""),
-                    )
-                    mock_wrapper.assert_not_called()
-
-    def test_configure_transport_exits_when_user_cancels(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                return_value=(False, "permission denied"),
-            ):
-                with mock.patch("skua.commands.run._prompt_remote_docker_recovery_action", return_value="cancel"):
-                    with mock.patch("sys.stdin.isatty", return_value=True):
-                        with mock.patch("sys.stdout.isatty", return_value=True):
-                            with self.assertRaises(SystemExit) as ctx:
-                                _configure_remote_docker_transport("docker.example.com")
-                            self.assertEqual(ctx.exception.code, 1)
-
-    def test_configure_transport_falls_back_when_user_selects_fallback(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                side_effect=[(False, "permission denied"), (True, "")],
-            ):
-                with mock.patch("skua.commands.run._prompt_remote_docker_recovery_action", return_value="fallback"):
-                    with mock.patch("sys.stdin.isatty", return_value=True):
-                        with mock.patch("sys.stdout.isatty", return_value=True):
-                            with mock.patch("skua.commands.run._enable_ssh_docker_wrapper") as mock_wrapper:
-                                _configure_remote_docker_transport("docker.example.com")
-                                mock_wrapper.assert_called_once_with("docker.example.com")
-
-    def test_configure_transport_install_success_retries_and_returns(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                side_effect=[(False, "permission denied"), (True, "")],
-            ):
-                with mock.patch("skua.commands.run._prompt_remote_docker_recovery_action", return_value="install"):
-                    with mock.patch("skua.commands.run._run_docker_cli_installer", return_value=True):
-                        with mock.patch("sys.stdin.isatty", return_value=True):
-                            with mock.patch("sys.stdout.isatty", return_value=True):
-                                with mock.patch("skua.commands.run._enable_ssh_docker_wrapper") as mock_wrapper:
-                                    _configure_remote_docker_transport("docker.example.com")
-                                    mock_wrapper.assert_not_called()
-
-    def test_configure_transport_install_fail_then_decline_fallback_exits(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                return_value=(False, "permission denied"),
-            ):
-                with mock.patch("skua.commands.run._prompt_remote_docker_recovery_action", return_value="install"):
-                    with mock.patch("skua.commands.run._run_docker_cli_installer", return_value=False):
-                        with mock.patch("builtins.input", return_value="n"):
-                            with mock.patch("sys.stdin.isatty", return_value=True):
-                                with mock.patch("sys.stdout.isatty", return_value=True):
-                                    with self.assertRaises(SystemExit) as ctx:
-                                        _configure_remote_docker_transport("docker.example.com")
-                                    self.assertEqual(ctx.exception.code, 1)
-
-    def test_configure_transport_falls_back_when_install_does_not_fix_connection(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                side_effect=[(False, "permission denied"), (False, "still denied"), (True, "")],
-            ):
-                with mock.patch("skua.commands.run._prompt_remote_docker_recovery_action", return_value="install"):
-                    with mock.patch("skua.commands.run._run_docker_cli_installer", return_value=True):
-                        with mock.patch("builtins.input", return_value=""):
-                            with mock.patch("sys.stdin.isatty", return_value=True):
-                                with mock.patch("sys.stdout.isatty", return_value=True):
-                                    with mock.patch("skua.commands.run._enable_ssh_docker_wrapper") as mock_wrapper:
-                                        _configure_remote_docker_transport("docker.example.com")
-                                        mock_wrapper.assert_called_once_with("docker.example.com")
-
-    def test_configure_transport_falls_back_when_non_interactive(self):
-        from skua.commands.run import _configure_remote_docker_transport
-
-        with mock.patch("skua.commands.run._prefer_non_snap_docker_on_path", return_value=""):
-            with mock.patch(
-                "skua.commands.run._probe_current_docker_connection",
-                side_effect=[(False, "permission denied"), (True, "")],
-            ):
-                with mock.patch("sys.stdin.isatty", return_value=False):
-                    with mock.patch("sys.stdout.isatty", return_value=False):
-                        with mock.patch("skua.commands.run._enable_ssh_docker_wrapper") as mock_wrapper:
-                            _configure_remote_docker_transport("docker.example.com")
-                            mock_wrapper.assert_called_once_with("docker.example.com")
+        _preserve_transport_env(self)
+        # Most transport paths are interactive; individual tests override this.
+        for stream in ("stdin", "stdout"):
+            patcher = mock.patch(f"sys.{stream}.isatty", return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @_patch_transport_helpers()
+    def test_configure_transport_keeps_docker_host_when_probe_succeeds(self, **helpers):
+        helpers["_probe_current_docker_connection"].return_value = (True, "")
+        _configure_remote_docker_transport("docker.example.com")
+        self.assertEqual(
+            "ssh://docker.example.com",
+            os.environ.get("DOCKER_HOST", ""),
+        )
+        helpers["_enable_ssh_docker_wrapper"].assert_not_called()
+
+    @_patch_transport_helpers()
+    def test_configure_transport_exits_when_user_cancels(self, **helpers):
+        helpers["_probe_current_docker_connection"].return_value = (False, "permission denied")
+        helpers["_prompt_remote_docker_recovery_action"].return_value = "cancel"
+        with self.assertRaises(SystemExit) as ctx:
+            _configure_remote_docker_transport("docker.example.com")
+        self.assertEqual(ctx.exception.code, 1)
+
+    @_patch_transport_helpers()
+    def test_configure_transport_falls_back_when_user_selects_fallback(self, **helpers):
+        helpers["_probe_current_docker_connection"].side_effect = _probe_sequence((False, "permission denied"), (True, ""))
+        helpers["_prompt_remote_docker_recovery_action"].return_value = "fallback"
+        _configure_remote_docker_transport("docker.example.com")
+        helpers["_enable_ssh_docker_wrapper"].assert_called_once_with("docker.example.com")
+
+    @_patch_transport_helpers()
+    def test_configure_transport_install_success_retries_and_returns(self, **helpers):
+        helpers["_probe_current_docker_connection"].side_effect = _probe_sequence((False, "permission denied"), (True, ""))
+        helpers["_prompt_remote_docker_recovery_action"].return_value = "install"
+        helpers["_run_docker_cli_installer"].return_value = True
+        _configure_remote_docker_transport("docker.example.com")
+        helpers["_enable_ssh_docker_wrapper"].assert_not_called()
+
+    @_patch_transport_helpers()
+    def test_configure_transport_install_fail_then_decline_fallback_exits(self, **helpers):
+        helpers["_probe_current_docker_connection"].return_value = (False, "permission denied")
+        helpers["_prompt_remote_docker_recovery_action"].return_value = "install"
+        helpers["_run_docker_cli_installer"].return_value = False
+        with mock.patch.object(run_mod, "input", create=True, return_value="n"):
+            with self.assertRaises(SystemExit) as ctx:
+                _configure_remote_docker_transport("docker.example.com")
+        self.assertEqual(ctx.exception.code, 1)
+
+    @_patch_transport_helpers()
+    def test_configure_transport_falls_back_when_install_does_not_fix_connection(self, **helpers):
+        helpers["_probe_current_docker_connection"].side_effect = _probe_sequence(
+            (False, "permission denied"), (False, "still denied"), (True, ""),
+        )
+        helpers["_prompt_remote_docker_recovery_action"].return_value = "install"
+        helpers["_run_docker_cli_installer"].return_value = True
+        with mock.patch.object(run_mod, "input", create=True, return_value=""):
+            _configure_remote_docker_transport("docker.example.com")
+        helpers["_enable_ssh_docker_wrapper"].assert_called_once_with("docker.example.com")
+
+    @_patch_transport_helpers()
+    @mock.patch("sys.stdout.isatty", return_value=False)
+    @mock.patch("sys.stdin.isatty", return_value=False)
+    def test_configure_transport_falls_back_when_non_interactive(self, _stdin, _stdout, **helpers):
+        helpers["_probe_current_docker_connection"].side_effect = _probe_sequence((False, "permission denied"), (True, ""))
+        _configure_remote_docker_transport("docker.example.com")
+        helpers["_enable_ssh_docker_wrapper"].assert_called_once_with("docker.example.com")
+
+    PROMPT_CASES = [
+        # (typed choice, expected action)
+        ("1", "install"),
+        ("2", "fallback"),
+        ("3", "cancel"),
+        ("unknown", "cancel"),
+    ]
 
     def test_prompt_remote_docker_recovery_action_maps_choices(self):
-        from skua.commands.run import _prompt_remote_docker_recovery_action
-
-        with mock.patch("builtins.input", return_value="1"):
-            self.assertEqual("install", _prompt_remote_docker_recovery_action())
-        with mock.patch("builtins.input", return_value="2"):
-            self.assertEqual("fallback", _prompt_remote_docker_recovery_action())
-        with mock.patch("builtins.input", return_value="3"):
-            self.assertEqual("cancel", _prompt_remote_docker_recovery_action())
-        with mock.patch("builtins.input", return_value="unknown"):
-            self.assertEqual("cancel", _prompt_remote_docker_recovery_action())
+        with mock.patch.object(run_mod, "input", create=True, side_effect=[choice for choice, _ in self.PROMPT_CASES]):
+            for choice, expected in self.PROMPT_CASES:
+                with self.subTest(choice=choice):
+                    self.assertEqual(expected, _prompt_remote_docker_recovery_action())
 
     def test_is_snap_binary_detects_snap_bin_path(self):
-        from skua.commands.run import _is_snap_binary
         self.assertTrue(_is_snap_binary("/snap/bin/docker"))
 
     def test_find_non_snap_docker_binary_prefers_installed_candidate(self):
-        from skua.commands.run import _find_non_snap_docker_binary
-
-        with mock.patch("skua.commands.run.shutil.which", return_value="/snap/bin/docker"):
-            with mock.patch("pathlib.Path.is_file", autospec=True) as mock_is_file:
-                with mock.patch("skua.commands.run.os.access") as mock_access:
-                    # Only /usr/local/bin/docker exists and is executable.
-                    mock_is_file.side_effect = lambda p: str(p) == "/usr/local/bin/docker"
-                    mock_access.side_effect = lambda p, mode: str(p) == "/usr/local/bin/docker"
-                    self.assertEqual("/usr/local/bin/docker", _find_non_snap_docker_binary())
+        # Only /usr/local/bin/docker exists and is executable.
+        def is_file(path):
+            return str(path) == "/usr/local/bin/docker"
 
-    def test_cmd_run_uses_fallback_path_when_transport_declined(self):
-        from skua.commands.run import cmd_run
+        def access(path, mode):
+            return str(path) == "/usr/local/bin/docker"
 
-        fake_project = Project(name="qar", host="docker.example.com")
+        with mock.patch.object(run_mod.shutil, "which", return_value="/snap/bin/docker"):
+            with mock.patch.object(Path, "is_file", is_file):
+                with mock.patch.object(run_mod.os, "access", access):
+                    self.assertEqual("/usr/local/bin/docker", _find_non_snap_docker_binary())
 
-        with mock.patch("skua.commands.run.ConfigStore") as MockStore:
+    def test_cmd_run_uses_fallback_path_when_transport_declined(self):
+        with mock.patch.object(run_mod, "ConfigStore") as MockStore:
             store = MockStore.return_value
-            store.resolve_project.return_value = fake_project
+            store.resolve_project.return_value = _REMOTE_PROJECT
 
-            with mock.patch("skua.commands.run._ensure_local_ssh_client_for_remote_docker"):
-                with mock.patch("skua.commands.run._configure_remote_docker_transport") as mock_transport:
-                    with mock.patch("skua.commands.run.is_container_running", return_value=True):
-                        with mock.patch("skua.commands.run.exec_into_container"):
-                            with mock.patch("builtins.input", return_value="n"):
+            with mock.patch.object(run_mod, "_ensure_local_ssh_client_for_remote_docker"):
+                with mock.patch.object(run_mod, "_configure_remote_docker_transport") as mock_transport:
+                    with mock.patch.object(run_mod, "is_container_running", return_value=True):
+                        with mock.patch.object(run_mod, "exec_into_container"):
+                            with mock.patch.object(run_mod, "input", create=True, return_value="n"):
                                 cmd_run(SimpleNamespace(name="qar"), lock_project=False)
                                 mock_transport.assert_called_once_with("docker.example.com")
 
@@ -246,118 +241,95 @@ class TestRemoteDockerTransportFallback(unittest.TestCase):
 class TestRemoteRepoCloneWithProjectSshKey(unittest.TestCase):
     """Validate remote repo clone behavior with project SSH key support."""
 
-    def setUp(self):
-        self._orig_env = os.environ.copy()
-
-    def tearDown(self):
-        os.environ.clear()
-        os.environ.update(self._orig_env)
+    @classmethod
+    def setUpClass(cls):
+        # The key material is only read, so one copy serves every test.
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        key_file = cls.tmpdir / "id_ed25519"
+        key_file.write_bytes(b"-----BEGIN TEST KEY-----\nabc\n-----END TEST KEY-----\n")
+        (cls.tmpdir / "known_hosts").write_bytes(b"github.com ssh-ed25519 AAAA...\n")
+        cls.key_path = str(key_file)
 
-    def test_remote_clone_uses_project_ssh_key_and_known_hosts(self):
-        from skua.commands.run import _clone_repo_into_remote_volume
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            key_path = os.path.join(tmpdir, "id_ed25519")
-            known_hosts_path = os.path.join(tmpdir, "known_hosts")
-            with open(key_path, "w", encoding="utf-8") as f:
-                f.write("-----BEGIN TEST KEY-----\nabc\n-----END TEST KEY-----\n")
-            with open(known_hosts_path, "w", encoding="utf-8") as f:
-                f.write("github.com ssh-ed25519 AAAA...\n")
-
-            project = Project(name="qar", repo="git@github.com:org/repo.git")
-            project.ssh.private_key = key_path
+    def setUp(self):
+        _preserve_transport_env(self)
+
+    def test_remote_clone_ssh_options_follow_project_key(self):
+        cases = [
+            # (case, project private key, key material forwarded)
+            ("project key with known_hosts", self.key_path, True),
+            ("no project key", "", False),
+        ]
+        mock_run = mock.Mock()
+        with mock.patch.object(run_mod.subprocess, "run", mock_run):
+            for case, private_key, forwarded in cases:
+                with self.subTest(case=case):
+                    mock_run.reset_mock()
+                    mock_run.side_effect = [
+                        mock.Mock(returncode=0, stdout="empty\n"),
+                        mock.Mock(returncode=0),
+                    ]
+                    project = dataclasses.replace(_REPO_PROJECT, ssh=ProjectSshSpec(private_key=private_key))
+                    _clone_repo_into_remote_volume(project, "skua-qar-repo")
 
-            mock_check = mock.Mock(returncode=0, stdout="empty\n")
-            mock_clone = mock.Mock(returncode=0)
-            with mock.patch("skua.commands.run.subprocess.run", side_effect=[mock_check, mock_clone]) as mock_run:
-                _clone_repo_into_remote_volume(project, "skua-qar-repo")
+                    self.assertEqual(2, mock_run.call_count)
+                    clone_call = mock_run.call_args_list[1]
+                    clone_cmd = clone_call.args[0]
+                    clone_env = clone_call.kwargs.get("env", {})
 
-                self.assertEqual(2, mock_run.call_count)
-                clone_call = mock_run.call_args_list[1]
-                clone_cmd = clone_call.args[0]
-                clone_env = clone_call.kwargs.get("env", {})
-
-                self.assertIn("-e", clone_cmd)
-                self.assertIn("SKUA_REMOTE_GIT_REPO", clone_cmd)
-                self.assertIn("SKUA_REMOTE_GIT_SSH_KEY_B64", clone_cmd)
-                self.assertIn("SKUA_REMOTE_GIT_KNOWN_HOSTS_B64", clone_cmd)
-                self.assertIn("--entrypoint", clone_cmd)
-                self.assertIn("sh", clone_cmd)
-                self.assertIn("alpine/git", clone_cmd)
-                self.assertEqual("git@github.com:org/repo.git", clone_env.get("SKUA_REMOTE_GIT_REPO"))
-                self.assertTrue(clone_env.get("SKUA_REMOTE_GIT_SSH_KEY_B64"))
-                self.assertTrue(clone_env.get("SKUA_REMOTE_GIT_KNOWN_HOSTS_B64"))
-
-    def test_remote_clone_uses_accept_new_even_without_project_key(self):
-        from skua.commands.run import _clone_repo_into_remote_volume
-
-        project = Project(name="qar", repo="git@github.com:org/repo.git")
-        project.ssh.private_key = ""
-
-        mock_check = mock.Mock(returncode=0, stdout="empty\n")
-        mock_clone = mock.Mock(returncode=0)
-        with mock.patch("skua.commands.run.subprocess.run", side_effect=[mock_check, mock_clone]) as mock_run:
-            _clone_repo_into_remote_volume(project, "skua-qar-repo")
-            clone_cmd = mock_run.call_args_list[1].args[0]
-            script = clone_cmd[-1]
-            self.assertIn("StrictHostKeyChecking=accept-new", script)
-            self.assertNotIn("SKUA_REMOTE_GIT_SSH_KEY_B64", clone_cmd)
+                    self.assertIn("SKUA_REMOTE_GIT_REPO", clone_cmd)
+                    self.assertEqual(["--entrypoint", "sh", "alpine/git", "-lc"], clone_cmd[-5:-1])
+                    self.assertIn("StrictHostKeyChecking=accept-new", clone_cmd[-1])
+                    self.assertEqual("git@github.com:org/repo.git", clone_env.get("SKUA_REMOTE_GIT_REPO"))
+                    for var in ("SKUA_REMOTE_GIT_SSH_KEY_B64", "SKUA_REMOTE_GIT_KNOWN_HOSTS_B64"):
+                        self.assertEqual(forwarded, var in clone_cmd)
+                        self.assertEqual(forwarded, bool(clone_env.get(var)))
 
 
 class TestRemoteAuthSeeding(unittest.TestCase):
     """Validate host-to-remote auth seeding behavior."""
 
+    @classmethod
+    def setUpClass(cls):
+        # Seeding only reads the source file; subprocess.run is always mocked.
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        cls.auth_file = cls.tmpdir / "auth.json"
+        cls.auth_file.write_bytes(b'{"token":"abc"}')
+
     def test_seed_auth_into_remote_volume_copies_missing_files(self):
-        from skua.commands.run import _seed_auth_into_remote_volume
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth_file = Path(tmpdir) / "auth.json"
-            auth_file.write_text('{"token":"abc"}')
-
-            check_missing = mock.Mock(returncode=1)
-            copy_ok = mock.Mock(returncode=0)
-            with mock.patch(
-                "skua.commands.run.resolve_credential_sources",
-                return_value=[(auth_file, "auth.json")],
-            ):
-                with mock.patch("skua.commands.run.subprocess.run", side_effect=[check_missing, copy_ok]) as mock_run:
-                    copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=False)
-                    self.assertEqual(1, copied)
-                    self.assertEqual(2, mock_run.call_count)
+        check_missing = mock.Mock(returncode=1)
+        copy_ok = mock.Mock(returncode=0)
+        with mock.patch.object(
+            run_mod, "resolve_credential_sources",
+            return_value=[(self.auth_file, "auth.json")],
+        ):
+            with mock.patch.object(run_mod.subprocess, "run", side_effect=[check_missing, copy_ok]) as mock_run:
+                copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=False)
+                self.assertEqual(1, copied)
+                self.assertEqual(2, mock_run.call_count)
 
     def test_seed_auth_into_remote_volume_skips_existing_when_not_overwriting(self):
-        from skua.commands.run import _seed_auth_into_remote_volume
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth_file = Path(tmpdir) / "auth.json"
-            auth_file.write_text('{"token":"abc"}')
-
-            check_exists = mock.Mock(returncode=0)
-            with mock.patch(
-                "skua.commands.run.resolve_credential_sources",
-                return_value=[(auth_file, "auth.json")],
-            ):
-                with mock.patch("skua.commands.run.subprocess.run", side_effect=[check_exists]) as mock_run:
-                    copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=False)
-                    self.assertEqual(0, copied)
-                    self.assertEqual(1, mock_run.call_count)
+        check_exists = mock.Mock(returncode=0)
+        with mock.patch.object(
+            run_mod, "resolve_credential_sources",
+            return_value=[(self.auth_file, "auth.json")],
+        ):
+            with mock.patch.object(run_mod.subprocess, "run", side_effect=[check_exists]) as mock_run:
+                copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=False)
+                self.assertEqual(0, copied)
+                self.assertEqual(1, mock_run.call_count)
 
     def test_seed_auth_into_remote_volume_overwrite_skips_existence_check(self):
-        from skua.commands.run import _seed_auth_into_remote_volume
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            auth_file = Path(tmpdir) / "auth.json"
-            auth_file.write_text('{"token":"abc"}')
-
-            copy_ok = mock.Mock(returncode=0)
-            with mock.patch(
-                "skua.commands.run.resolve_credential_sources",
-                return_value=[(auth_file, "auth.json")],
-            ):
-                with mock.patch("skua.commands.run.subprocess.run", side_effect=[copy_ok]) as mock_run:
-                    copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=True)
-                    self.assertEqual(1, copied)
-                    self.assertEqual(1, mock_run.call_count)
+        copy_ok = mock.Mock(returncode=0)
+        with mock.patch.object(
+            run_mod, "resolve_credential_sources",
+            return_value=[(self.auth_file, "auth.json")],
+        ):
+            with mock.patch.object(run_mod.subprocess, "run", side_effect=[copy_ok]) as mock_run:
+                copied = _seed_auth_into_remote_volume("qar", "claude", cred=None, agent=mock.Mock(), overwrite=True)
+                self.assertEqual(1, copied)
+                self.assertEqual(1, mock_run.call_count)
 
 
 class TestRemoteRunImageRefresh(unittest.TestCase):
@@ -381,55 +353,41 @@ class TestRemoteRunImageRefresh(unittest.TestCase):
         store.load_credential.return_value = None
         return store
 
-    def test_cmd_run_rebuilds_existing_remote_image_when_context_is_stale(self):
-        from skua.commands.run import cmd_run
-
-        project = Project(name="qar", host="docker.example.com", agent="codex")
+    def _run_remote(self, rebuild_result):
+        """Run `skua run` for a stopped remote project and return the build_image mock."""
+        project = dataclasses.replace(_REMOTE_PROJECT, agent="codex")
         store = self._store_for(project)
+        mock_build = mock.Mock(return_value=(True, ""))
+
+        with mock.patch.multiple(
+            run_mod,
+            ConfigStore=mock.Mock(return_value=store),
+            _ensure_local_ssh_client_for_remote_docker=mock.DEFAULT,
+            _configure_remote_docker_transport=mock.DEFAULT,
+            is_container_running=mock.Mock(return_value=False),
+            validate_project=mock.Mock(return_value=SimpleNamespace(valid=True, warnings=[], errors=[])),
+            image_name_for_project=mock.Mock(return_value="skua-base-codex"),
+            resolve_project_image_inputs=mock.Mock(return_value=("debian:bookworm-slim", [], [])),
+            image_exists=mock.Mock(return_value=True),
+            image_rebuild_needed=mock.Mock(return_value=rebuild_result),
+            build_image=mock_build,
+            _maybe_refresh_local_credentials=mock.Mock(return_value=False),
+            _seed_auth_into_remote_volume=mock.Mock(return_value=0),
+            build_run_command=mock.Mock(return_value=["docker", "run"]),
+            start_container=mock.Mock(return_value=True),
+            wait_for_running_container=mock.Mock(return_value=True),
+            exec_into_container=mock.DEFAULT,
+        ):
+            cmd_run(SimpleNamespace(name="qar"), lock_project=False)
+        return mock_build
 
-        with mock.patch("skua.commands.run.ConfigStore", return_value=store):
-            with mock.patch("skua.commands.run._ensure_local_ssh_client_for_remote_docker"):
-                with mock.patch("skua.commands.run._configure_remote_docker_transport"):
-                    with mock.patch("skua.commands.run.is_container_running", return_value=False):
-                        with mock.patch("skua.commands.run.validate_project", return_value=SimpleNamespace(valid=True, warnings=[], errors=[])):
-                            with mock.patch("skua.commands.run.image_name_for_project", return_value="skua-base-codex"):
-                                with mock.patch("skua.commands.run.resolve_project_image_inputs", return_value=("debian:bookworm-slim", [], [])):
-                                    with mock.patch("skua.commands.run.image_exists", return_value=True):
-                                        with mock.patch("skua.commands.run.image_rebuild_needed", return_value=(True, False, "build context changed")):
-                                            with mock.patch("skua.commands.run.build_image", return_value=(True, "")) as mock_build:
-                                                with mock.patch("skua.commands.run._maybe_refresh_local_credentials", return_value=False):
-                                                    with mock.patch("skua.commands.run._seed_auth_into_remote_volume", return_value=0):
-                                                        with mock.patch("skua.commands.run.build_run_command", return_value=["docker", "run"]):
-                                                            with mock.patch("skua.commands.run.start_container", return_value=True):
-                                                                with mock.patch("skua.commands.run.wait_for_running_container", return_value=True):
-                                                                    with mock.patch("skua.commands.run.exec_into_container"):
-                                                                        cmd_run(SimpleNamespace(name="qar"), lock_project=False)
-                                                    mock_build.assert_called_once()
+    def test_cmd_run_rebuilds_existing_remote_image_when_context_is_stale(self):
+        mock_build = self._run_remote((True, False, "build context changed"))
+        mock_build.assert_called_once()
 
     def test_cmd_run_skips_rebuild_when_existing_remote_image_is_current(self):
-        from skua.commands.run import cmd_run
-
-        project = Project(name="qar", host="docker.example.com", agent="codex")
-        store = self._store_for(project)
-
-        with mock.patch("skua.commands.run.ConfigStore", return_value=store):
-            with mock.patch("skua.commands.run._ensure_local_ssh_client_for_remote_docker"):
-                with mock.patch("skua.commands.run._configure_remote_docker_transport"):
-                    with mock.patch("skua.commands.run.is_container_running", return_value=False):
-                        with mock.patch("skua.commands.run.validate_project", return_value=SimpleNamespace(valid=True, warnings=[], errors=[])):
-                            with mock.patch("skua.commands.run.image_name_for_project", return_value="skua-base-codex"):
-                                with mock.patch("skua.commands.run.resolve_project_image_inputs", return_value=("debian:bookworm-slim", [], [])):
-                                    with mock.patch("skua.commands.run.image_exists", return_value=True):
-                                        with mock.patch("skua.commands.run.image_rebuild_needed", return_value=(False, False, "")):
-                                            with mock.patch("skua.commands.run.build_image", return_value=(True, "")) as mock_build:
-                                                with mock.patch("skua.commands.run._maybe_refresh_local_credentials", return_value=False):
-                                                    with mock.patch("skua.commands.run._seed_auth_into_remote_volume", return_value=0):
-                                                        with mock.patch("skua.commands.run.build_run_command", return_value=["docker", "run"]):
-                                                            with mock.patch("skua.commands.run.start_container", return_value=True):
-                                                                with mock.patch("skua.commands.run.wait_for_running_container", return_value=True):
-                                                                    with mock.patch("skua.commands.run.exec_into_container"):
-                                                                        cmd_run(SimpleNamespace(name="qar"), lock_project=False)
-                                                    mock_build.assert_not_called()
+        mock_build = self._run_remote((False, False, ""))
+        mock_build.assert_not_called()
 
 
 if __name__ == "__main__":
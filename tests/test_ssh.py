@@ -14,33 +14,83 @@ Environment variables (alternative to flags):
 """
 
 import argparse
+import atexit
+import concurrent.futures
+import functools
 import os
+import random
 import subprocess
 import sys
+import time
 import unittest
+import uuid
 from pathlib import Path
 
 # ── Resolve test parameters from flags or env ─────────────────────────────
 
-SSH_KEY = None
-REPO_URL = None
+# Read from the environment at import so runners that never call
+# parse_test_args (pytest, unittest discovery) still see them.
+SSH_KEY = os.environ.get("SKUA_TEST_SSH_KEY", "")
+REPO_URL = os.environ.get("SKUA_TEST_REPO", "")
 IMAGE_NAME = "skua-base"
 CONTAINER_PREFIX = "skua-test"
+_DOCKER_RUN_BASE = ("docker", "run", "--rm")
+# Background image check started by parse_test_args, if it ran.
+_IMAGE_CHECK = None
+# Set once container_name() has registered the atexit cleanup.
+_CLEANUP_REGISTERED = False
 
 
 def parse_test_args():
     """Parse --ssh-key and --repo before unittest takes over."""
-    global SSH_KEY, REPO_URL
+    global SSH_KEY, REPO_URL, _IMAGE_CHECK
     parser = argparse.ArgumentParser(add_help=False)
-    parser.add_argument("--ssh-key", default=os.environ.get("SKUA_TEST_SSH_KEY", ""))
-    parser.add_argument("--repo", default=os.environ.get("SKUA_TEST_REPO", ""))
+    parser.add_argument("--ssh-key", default=SSH_KEY)
+    parser.add_argument("--repo", default=REPO_URL)
     args, remaining = parser.parse_known_args()
     SSH_KEY = args.ssh_key
     REPO_URL = args.repo
+    # Let `docker image inspect` run while unittest loads the tests.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    _IMAGE_CHECK = executor.submit(image_exists)
+    executor.shutdown(wait=False)
     # Return remaining args so unittest can parse them
     return remaining
 
 
+def container_name():
+    """Return a container name unique across processes and parallel workers.
+
+    The pid prefix lets ``remove_orphaned_containers`` clean up after this
+    process without touching containers owned by other workers. The first
+    call registers that cleanup, so runs that never start a container skip it.
+    """
+    global _CLEANUP_REGISTERED
+    if not _CLEANUP_REGISTERED:
+        atexit.register(remove_orphaned_containers)
+        _CLEANUP_REGISTERED = True
+    return f"{CONTAINER_PREFIX}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def kill_container(name):
+    """Kill a container whose client call timed out; ``--rm`` then removes it."""
+    subprocess.run(["docker", "kill", name], capture_output=True, timeout=10)
+
+
+def remove_orphaned_containers():
+    """Force-remove any container this process started and failed to clean up."""
+    try:
+        listed = subprocess.run(
+            ["docker", "ps", "-aq", "--filter", f"name={CONTAINER_PREFIX}-{os.getpid()}-"],
+            capture_output=True, text=True, timeout=30,
+        )
+        ids = listed.stdout.split()
+        if ids:
+            subprocess.run(["docker", "rm", "-f", *ids], capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
 def require_ssh_key():
     if not SSH_KEY or not Path(SSH_KEY).is_file():
         raise unittest.SkipTest(
@@ -56,160 +106,278 @@ def require_repo():
         )
 
 
-def docker_run(cmd, mounts=None, env=None, timeout=60):
+@functools.lru_cache(maxsize=4)
+def ssh_mounts(ssh_key):
+    """Build the standard SSH mount list matching skua's behavior.
+
+    Returns a tuple of ``(src, dst, mode)`` triples; the host files are only
+    resolved and stat'ed once per key.
+    """
+    key_path = Path(ssh_key).resolve()
+    key_name = key_path.name
+    mounts = [(str(key_path), f"/home/dev/.ssh-mount/{key_name}", "ro")]
+    pub = Path(f"{key_path}.pub")
+    if pub.is_file():
+        mounts.append((str(pub), f"/home/dev/.ssh-mount/{key_name}.pub", "ro"))
+    known = key_path.parent / "known_hosts"
+    if known.is_file():
+        mounts.append((str(known), "/home/dev/.ssh-mount/known_hosts", "ro"))
+    return tuple(mounts)
+
+
+@functools.lru_cache(maxsize=8)
+def mount_args(mounts):
+    """Return the ``docker run`` argv for a tuple of ``(src, dst, mode)`` mounts."""
+    args = []
+    for src, dst, mode in mounts:
+        spec = f"type=bind,src={src},dst={dst},bind-propagation=rprivate"
+        if mode == "ro":
+            spec += ",readonly"
+        args.extend(["--mount", spec])
+    return tuple(args)
+
+
+def docker_run(cmd, mounts=None, env=None, timeout=60, network=None):
     """Run a command inside a fresh skua container and return stdout.
 
     Uses a marker line to separate entrypoint banner output from the
-    actual command output, so tests can reliably parse results.
+    actual command output, so tests can reliably parse results. Pass
+    ``network="none"`` for probes that never leave the container.
     """
-    marker = "___SKUA_TEST_OUTPUT___"
-    wrapped_cmd = f'echo "{marker}"; {cmd}'
-    docker_cmd = [
-        "docker", "run", "--rm",
-        "--name", f"{CONTAINER_PREFIX}-{os.getpid()}",
-    ]
-    for src, dst, mode in (mounts or []):
-        docker_cmd.extend(["-v", f"{src}:{dst}:{mode}"])
+    marker = b"___SKUA_TEST_OUTPUT___"
+    wrapped_cmd = f'echo "{marker.decode()}"; {cmd}'
+    name = container_name()
+    docker_cmd = [*_DOCKER_RUN_BASE, "--name", name, *mount_args(mounts or ())]
     for k, v in (env or {}).items():
         docker_cmd.extend(["-e", f"{k}={v}"])
-    docker_cmd.extend([IMAGE_NAME, "bash", "-c", wrapped_cmd])
-
-    result = subprocess.run(
-        docker_cmd, capture_output=True, text=True, timeout=timeout
-    )
+    if network:
+        docker_cmd.extend(["--network", network])
+    docker_cmd += (IMAGE_NAME, "bash", "-c", wrapped_cmd)
+
+    # Capture bytes and decode only what callers read: clone/fetch output can
+    # be large, and the banner before the marker is discarded anyway.
+    try:
+        result = subprocess.run(docker_cmd, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # The daemon keeps running the container after the client is killed.
+        kill_container(name)
+        raise
+    stdout = result.stdout
     # Strip entrypoint banner: everything before the marker
-    if marker in result.stdout:
-        result.stdout = result.stdout.split(marker, 1)[1].lstrip("\n")
+    _, sep, tail = stdout.partition(marker)
+    if sep:
+        stdout = tail.lstrip(b"\n")
+    result.stdout = stdout.decode("utf-8", "replace")
+    result.stderr = result.stderr.decode("utf-8", "replace")
     return result
 
 
-def image_exists():
-    result = subprocess.run(
-        ["docker", "image", "inspect", IMAGE_NAME],
-        capture_output=True, text=True
+# Output from ssh/git that means the network dropped us, not that auth failed.
+TRANSIENT_NETWORK_ERRORS = ("Connection reset", "kex_exchange_identification")
+
+
+def retry(attempts=3, base=1.0):
+    """Retry a ``docker_run``-style call on timeouts and transient network errors.
+
+    Waits ``base * 2**i`` seconds plus up to a second of jitter between
+    attempts. The last attempt's result (or timeout) is returned as-is.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for i in range(attempts):
+                last = i == attempts - 1
+                try:
+                    result = func(*args, **kwargs)
+                except subprocess.TimeoutExpired:
+                    if last:
+                        raise
+                else:
+                    output = result.stdout + result.stderr
+                    if last or not any(err in output for err in TRANSIENT_NETWORK_ERRORS):
+                        return result
+                time.sleep(base * 2 ** i + random.random())
+        return wrapper
+    return decorator
+
+
+# Network tests only: mount probes are deterministic and must not retry.
+network_docker_run = retry()(docker_run)
+
+
+# Where a long-lived test container saves the environment its entrypoint
+# exported, so `docker exec` probes see the same variables as `docker run`.
+ENTRYPOINT_ENV_FILE = "/tmp/skua-test-entrypoint.env"
+
+
+def start_container(mounts=None, ready_timeout=60, network=None):
+    """Start a detached skua container for ``docker_exec`` probes.
+
+    The image entrypoint runs once, then the container idles until removed
+    with ``stop_container``. Returns the container name.
+    """
+    name = container_name()
+    save_env = (
+        f"export -p > {ENTRYPOINT_ENV_FILE}.tmp && "
+        f"mv {ENTRYPOINT_ENV_FILE}.tmp {ENTRYPOINT_ENV_FILE} && "
+        "exec sleep infinity"
     )
+    docker_cmd = [*_DOCKER_RUN_BASE, "-d", "--name", name, *mount_args(mounts or ())]
+    if network:
+        docker_cmd.extend(["--network", network])
+    docker_cmd += (IMAGE_NAME, "bash", "-c", save_env)
+    try:
+        result = subprocess.run(docker_cmd, capture_output=True, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        kill_container(name)
+        raise
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to start test container {name}: {result.stderr}")
+
+    # The entrypoint is still running when `docker run -d` returns.
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        probe = subprocess.run(
+            ["docker", "exec", name, "test", "-f", ENTRYPOINT_ENV_FILE],
+            capture_output=True, text=True, timeout=10,
+        )
+        if probe.returncode == 0:
+            return name
+        time.sleep(0.2)
+    stop_container(name)
+    raise RuntimeError(f"Test container {name} did not finish its entrypoint in {ready_timeout}s")
+
+
+def stop_container(name):
+    subprocess.run(["docker", "rm", "-f", name], capture_output=True, text=True, timeout=30)
+
+
+def docker_exec(container, cmd, timeout=60):
+    """Run a command in a container from ``start_container`` and return the result.
+
+    The entrypoint banner was printed when the container started, so stdout
+    holds only the command output.
+    """
+    return subprocess.run(
+        ["docker", "exec", container, "bash", "-c", f". {ENTRYPOINT_ENV_FILE}; {cmd}"],
+        capture_output=True, text=True, timeout=timeout,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def image_exists():
+    """Check once per run whether the test image is built (False without docker)."""
+    try:
+        result = subprocess.run(
+            ["docker", "image", "inspect", IMAGE_NAME],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return False
     return result.returncode == 0
 
 
 # ── Tests ──────────────────────────────────────────────────────────────────
 
 
-class TestSSHKeyMounting(unittest.TestCase):
-    """Test that SSH keys are correctly mounted into the container."""
+class _RequiresImage(unittest.TestCase):
+    """Skip the whole class unless the skua test image has been built."""
 
     @classmethod
     def setUpClass(cls):
+        super().setUpClass()
+        if _IMAGE_CHECK is not None:
+            _IMAGE_CHECK.result()
         if not image_exists():
             raise unittest.SkipTest(f"Docker image '{IMAGE_NAME}' not found. Run 'skua build' first.")
+
+
+class TestSSHKeyMounting(_RequiresImage):
+    """Test that SSH keys are correctly mounted into the container."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
         require_ssh_key()
+        # Every probe only reads state the entrypoint set up, so share one
+        # container and skip network setup for it.
+        cls.container = start_container(mounts=ssh_mounts(SSH_KEY), network="none")
+        cls.addClassCleanup(stop_container, cls.container)
+        cls.key_name = Path(SSH_KEY).name
+        cls.state, cls.probe_stderr = cls._collect_ssh_state()
 
-    def _ssh_mounts(self):
-        """Build the standard SSH mount list matching skua's behavior."""
-        key_path = Path(SSH_KEY).resolve()
-        key_name = key_path.name
-        mounts = [(str(key_path), f"/home/dev/.ssh-mount/{key_name}", "ro")]
-        pub = Path(f"{key_path}.pub")
-        if pub.is_file():
-            mounts.append((str(pub), f"/home/dev/.ssh-mount/{key_name}.pub", "ro"))
-        known = key_path.parent / "known_hosts"
-        if known.is_file():
-            mounts.append((str(known), "/home/dev/.ssh-mount/known_hosts", "ro"))
-        return mounts
+    @classmethod
+    def _collect_ssh_state(cls):
+        """Run every mount/permission probe in one exec and parse ``NAME=value`` lines."""
+        mount_dir = "/home/dev/.ssh-mount"
+        probe = (
+            f'test -f {mount_dir}/{cls.key_name} && echo KEY_MOUNTED=yes; '
+            f'test -f {mount_dir}/{cls.key_name}.pub && echo PUB_MOUNTED=yes; '
+            f'test -f {mount_dir}/known_hosts && echo KNOWN_HOSTS_MOUNTED=yes; '
+            f'echo "KEY_PERMS=$(stat -c "%a" /home/dev/.ssh/{cls.key_name})"; '
+            'echo "SSH_DIR_PERMS=$(stat -c "%a" /home/dev/.ssh)"; '
+            'echo "GIT_SSH_COMMAND=$GIT_SSH_COMMAND"'
+        )
+        result = docker_exec(cls.container, probe)
+        state = {}
+        for line in result.stdout.splitlines():
+            name, sep, value = line.partition("=")
+            if sep:
+                state[name] = value
+        return state, result.stderr
 
     def test_key_is_mounted(self):
         """Private key file exists inside the container."""
-        key_name = Path(SSH_KEY).name
-        result = docker_run(
-            f"test -f /home/dev/.ssh-mount/{key_name} && echo OK",
-            mounts=self._ssh_mounts(),
-        )
-        self.assertEqual(result.stdout.strip(), "OK", result.stderr)
+        self.assertEqual(self.state.get("KEY_MOUNTED"), "yes", self.probe_stderr)
 
     def test_pub_key_is_mounted(self):
         """Public key file exists if available on host."""
-        pub = Path(f"{SSH_KEY}.pub")
-        if not pub.is_file():
+        if not Path(f"{SSH_KEY}.pub").is_file():
             self.skipTest("No .pub file for this key")
-        key_name = Path(SSH_KEY).name
-        result = docker_run(
-            f"test -f /home/dev/.ssh-mount/{key_name}.pub && echo OK",
-            mounts=self._ssh_mounts(),
-        )
-        self.assertEqual(result.stdout.strip(), "OK", result.stderr)
+        self.assertEqual(self.state.get("PUB_MOUNTED"), "yes", self.probe_stderr)
 
     def test_known_hosts_is_mounted(self):
         """known_hosts file exists if available on host."""
-        known = Path(SSH_KEY).parent / "known_hosts"
-        if not known.is_file():
+        if not (Path(SSH_KEY).parent / "known_hosts").is_file():
             self.skipTest("No known_hosts file")
-        result = docker_run(
-            "test -f /home/dev/.ssh-mount/known_hosts && echo OK",
-            mounts=self._ssh_mounts(),
-        )
-        self.assertEqual(result.stdout.strip(), "OK", result.stderr)
+        self.assertEqual(self.state.get("KNOWN_HOSTS_MOUNTED"), "yes", self.probe_stderr)
 
     def test_entrypoint_copies_key_with_correct_permissions(self):
         """Entrypoint copies keys to ~/.ssh with 600 permissions."""
-        key_name = Path(SSH_KEY).name
-        result = docker_run(
-            f'stat -c "%a" /home/dev/.ssh/{key_name}',
-            mounts=self._ssh_mounts(),
-        )
-        self.assertEqual(result.stdout.strip(), "600",
-                         f"Expected 600 permissions, got: {result.stdout.strip()}\n{result.stderr}")
+        perms = self.state.get("KEY_PERMS")
+        self.assertEqual(perms, "600", f"Expected 600 permissions, got: {perms}\n{self.probe_stderr}")
 
     def test_ssh_dir_permissions(self):
         """~/.ssh directory has 700 permissions after entrypoint."""
-        result = docker_run(
-            'stat -c "%a" /home/dev/.ssh',
-            mounts=self._ssh_mounts(),
-        )
-        self.assertEqual(result.stdout.strip(), "700",
-                         f"Expected 700 permissions, got: {result.stdout.strip()}\n{result.stderr}")
+        perms = self.state.get("SSH_DIR_PERMS")
+        self.assertEqual(perms, "700", f"Expected 700 permissions, got: {perms}\n{self.probe_stderr}")
 
     def test_git_ssh_command_is_set(self):
         """GIT_SSH_COMMAND is configured with the key after entrypoint."""
-        key_name = Path(SSH_KEY).name
-        result = docker_run(
-            'echo "$GIT_SSH_COMMAND"',
-            mounts=self._ssh_mounts(),
-        )
-        self.assertIn(key_name, result.stdout,
-                      f"GIT_SSH_COMMAND should reference {key_name}: {result.stdout}")
-        self.assertIn("-i", result.stdout)
+        git_ssh = self.state.get("GIT_SSH_COMMAND", "")
+        self.assertIn(self.key_name, git_ssh,
+                      f"GIT_SSH_COMMAND should reference {self.key_name}: {git_ssh}")
+        self.assertIn("-i", git_ssh)
 
 
-class TestSSHGitOperations(unittest.TestCase):
+class TestSSHGitOperations(_RequiresImage):
     """Test that git operations over SSH work inside the container."""
 
     @classmethod
     def setUpClass(cls):
-        if not image_exists():
-            raise unittest.SkipTest(f"Docker image '{IMAGE_NAME}' not found. Run 'skua build' first.")
+        super().setUpClass()
         require_ssh_key()
         require_repo()
 
-    def _ssh_mounts(self):
-        key_path = Path(SSH_KEY).resolve()
-        key_name = key_path.name
-        mounts = [(str(key_path), f"/home/dev/.ssh-mount/{key_name}", "ro")]
-        pub = Path(f"{key_path}.pub")
-        if pub.is_file():
-            mounts.append((str(pub), f"/home/dev/.ssh-mount/{key_name}.pub", "ro"))
-        known = key_path.parent / "known_hosts"
-        if known.is_file():
-            mounts.append((str(known), "/home/dev/.ssh-mount/known_hosts", "ro"))
-        return mounts
-
     def test_ssh_github_auth(self):
         """SSH authentication to the git host succeeds."""
         # Extract user@host from repo URL (git@github.com:user/repo.git -> git@github.com)
         if "@" not in REPO_URL:
             self.skipTest("Cannot extract host from repo URL")
         user_host = REPO_URL.split(":")[0]  # git@github.com
-        result = docker_run(
+        result = network_docker_run(
             f'ssh -T -o StrictHostKeyChecking=accept-new {user_host} 2>&1; true',
-            mounts=self._ssh_mounts(),
+            mounts=ssh_mounts(SSH_KEY),
             timeout=30,
         )
         # GitHub returns exit 1 but prints "successfully authenticated"
@@ -221,12 +389,14 @@ class TestSSHGitOperations(unittest.TestCase):
         )
 
     def test_git_clone(self):
-        """git clone over SSH succeeds inside the container."""
-        result = docker_run(
-            f'git clone --depth 1 {REPO_URL} /tmp/test-clone '
-            f'&& test -d /tmp/test-clone/.git && echo OK',
-            mounts=self._ssh_mounts(),
-            env={"GIT_AUTHOR_NAME": "test", "GIT_AUTHOR_EMAIL": "test@test.com"},
+        """Fetching a commit over SSH succeeds inside the container."""
+        # A shallow fetch into an empty repo exercises the same pack transfer
+        # as a clone without writing a working tree.
+        result = network_docker_run(
+            f'git init -q /tmp/test-clone && cd /tmp/test-clone '
+            f'&& git fetch -q --depth=1 --no-tags --filter=blob:none {REPO_URL} HEAD '
+            f'&& git rev-parse -q --verify FETCH_HEAD >/dev/null && echo OK',
+            mounts=ssh_mounts(SSH_KEY),
             timeout=60,
         )
         self.assertIn("OK", result.stdout,
@@ -234,9 +404,9 @@ class TestSSHGitOperations(unittest.TestCase):
 
     def test_git_ls_remote(self):
         """git ls-remote over SSH succeeds (lighter than clone)."""
-        result = docker_run(
+        result = network_docker_run(
             f'git ls-remote --heads {REPO_URL} 2>&1 | head -5',
-            mounts=self._ssh_mounts(),
+            mounts=ssh_mounts(SSH_KEY),
             timeout=30,
         )
         self.assertEqual(result.returncode, 0,
@@ -248,17 +418,19 @@ class TestSSHGitOperations(unittest.TestCase):
         )
 
 
-class TestNoSSHKey(unittest.TestCase):
+class TestNoSSHKey(_RequiresImage):
     """Test container behavior when no SSH key is provided."""
 
     @classmethod
     def setUpClass(cls):
-        if not image_exists():
-            raise unittest.SkipTest(f"Docker image '{IMAGE_NAME}' not found. Run 'skua build' first.")
+        super().setUpClass()
+        cls.container = start_container(network="none")
+        cls.addClassCleanup(stop_container, cls.container)
 
     def test_no_ssh_mount_dir(self):
         """Without SSH mounts, .ssh-mount is empty or absent and entrypoint handles it."""
-        result = docker_run(
+        result = docker_exec(
+            self.container,
             'if [ -d /home/dev/.ssh-mount ]; then '
             '  count=$(ls -A /home/dev/.ssh-mount 2>/dev/null | wc -l); '
             '  echo "exists:empty=$([[ $count -eq 0 ]] && echo yes || echo no)"; '
@@ -275,7 +447,8 @@ class TestNoSSHKey(unittest.TestCase):
 
     def test_git_ssh_command_not_set(self):
         """GIT_SSH_COMMAND is not set when no key is mounted."""
-        result = docker_run(
+        result = docker_exec(
+            self.container,
             'echo "GIT_SSH_COMMAND=${GIT_SSH_COMMAND:-UNSET}"',
         )
         self.assertIn("UNSET", result.stdout)